@@ -0,0 +1,171 @@
+"""
+Fake DIAL core: streaming chat completions for every deployment and in-memory file storage.
+
+The agent deployment follows scripts from `scenarios`, all other deployments (web search, RAG answers, ...)
+stream a plain answer. Token timing is controlled by `--first-token-delay` and `--token-delay`.
+
+Run: python -m benchmarks.e2e.fake_dial --port 8180 --agent-deployment bench-agent
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from benchmarks.e2e.scenarios import BUCKET, DOCUMENT_URL, parse_user_message, tool_calls_for_step
+from task.utils import serialization
+
+_WORDS = ["The ", "agent ", "has ", "processed ", "your ", "request ", "and ", "found ", "relevant ", "details. "]
+
+
+class FakeDial:
+
+    def __init__(
+            self,
+            agent_deployment: str,
+            first_token_delay: float,
+            token_delay: float,
+            answer_tokens: int,
+            tool_args_chunks: int = 4,
+    ):
+        self.agent_deployment = agent_deployment
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.tool_args_chunks = tool_args_chunks
+        self.files: dict[str, bytes] = {}
+        self.calls: dict[str, int] = {}
+
+        document = Path(__file__).parents[2] / "tests" / "microwave_manual.txt"
+        if document.is_file():
+            self.files[DOCUMENT_URL.removeprefix("files/")] = document.read_bytes()
+
+    def create_app(self) -> FastAPI:
+        app = FastAPI()
+        app.post("/openai/deployments/{deployment}/chat/completions")(self.chat_completions)
+        app.get("/v1/bucket")(self.bucket)
+        app.put("/v1/files/{path:path}")(self.upload)
+        app.get("/v1/files/{path:path}")(self.download)
+        app.get("/stats")(self.stats)
+        return app
+
+    async def chat_completions(self, deployment: str, request: Request) -> StreamingResponse:
+        body = await request.json()
+        self.calls[deployment] = self.calls.get(deployment, 0) + 1
+        return StreamingResponse(self._stream(deployment, body), media_type="text/event-stream")
+
+    async def bucket(self) -> JSONResponse:
+        return JSONResponse({"bucket": BUCKET, "appdata": f"{BUCKET}/appdata/general-purpose-agent"})
+
+    async def upload(self, path: str, request: Request) -> JSONResponse:
+        # Multipart body is stored as is, benchmark only needs upload latency and size
+        data = await request.body()
+        self.files[path] = data
+        name = path.rsplit("/", 1)[-1]
+        return JSONResponse({
+            "name": name,
+            "parentPath": path.rsplit("/", 1)[0],
+            "bucket": BUCKET,
+            "url": f"files/{path}",
+            "nodeType": "ITEM",
+            "resourceType": "FILE",
+            "contentLength": len(data),
+        })
+
+    async def download(self, path: str) -> Response:
+        data = self.files.get(path)
+        if data is None:
+            return JSONResponse({"error": {"message": f"File {path} not found"}}, status_code=404)
+        return Response(content=data, media_type="application/octet-stream")
+
+    async def stats(self) -> JSONResponse:
+        return JSONResponse({"calls": self.calls, "files": len(self.files)})
+
+    async def _stream(self, deployment: str, body: dict[str, Any]) -> AsyncIterator[str]:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        await asyncio.sleep(self.first_token_delay)
+
+        tool_calls = self._tool_calls(body) if deployment == self.agent_deployment else None
+        if tool_calls:
+            for index, (name, arguments) in enumerate(tool_calls):
+                async for delta in self._tool_call_deltas(index, name, arguments):
+                    yield self._chunk(completion_id, deployment, delta)
+            yield self._chunk(completion_id, deployment, {}, finish_reason="tool_calls")
+        else:
+            for i in range(self.answer_tokens):
+                yield self._chunk(completion_id, deployment, {"role": "assistant", "content": _WORDS[i % len(_WORDS)]})
+                await asyncio.sleep(self.token_delay)
+            yield self._chunk(completion_id, deployment, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    def _tool_calls(self, body: dict[str, Any]) -> list[tuple[str, dict]] | None:
+        messages = body.get("messages") or []
+        user_messages = [m for m in messages if m.get("role") == "user"]
+        if not user_messages:
+            return None
+        last_user_index = max(i for i, m in enumerate(messages) if m.get("role") == "user")
+        step = sum(
+            1 for m in messages[last_user_index + 1:]
+            if m.get("role") == "assistant" and m.get("tool_calls")
+        )
+        scenario, n = parse_user_message(user_messages[-1].get("content") or "")
+        available = {tool["function"]["name"] for tool in body.get("tools") or []}
+        tool_calls = tool_calls_for_step(scenario, n, step)
+        if not tool_calls:
+            return None
+        # Tools that are not configured in the app (e.g. MCP server is down) are skipped
+        return [(name, arguments) for name, arguments in tool_calls if name in available] or None
+
+    async def _tool_call_deltas(self, index: int, name: str, arguments: dict) -> AsyncIterator[dict[str, Any]]:
+        yield {
+            "role": "assistant",
+            "tool_calls": [{
+                "index": index,
+                "id": f"call_{uuid.uuid4().hex[:16]}",
+                "type": "function",
+                "function": {"name": name, "arguments": ""},
+            }],
+        }
+        raw_arguments = serialization.dumps(arguments)
+        chunk_size = max(1, len(raw_arguments) // self.tool_args_chunks + 1)
+        for start in range(0, len(raw_arguments), chunk_size):
+            await asyncio.sleep(self.token_delay)
+            yield {"tool_calls": [{"index": index, "function": {"arguments": raw_arguments[start:start + chunk_size]}}]}
+
+    @staticmethod
+    def _chunk(completion_id: str, deployment: str, delta: dict[str, Any], finish_reason: str | None = None) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {serialization.dumps(chunk)}\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8180)
+    parser.add_argument("--agent-deployment", default="bench-agent")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--answer-tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    fake_dial = FakeDial(
+        agent_deployment=args.agent_deployment,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        answer_tokens=args.answer_tokens,
+    )
+    uvicorn.run(fake_dial.create_app(), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Fake MCP servers with the same tool names and result formats as PyInterpreter and DDG search servers.
+
+Run: python -m benchmarks.e2e.fake_mcp --kind interpreter --port 8150 --delay 0.2
+     python -m benchmarks.e2e.fake_mcp --kind ddg --port 8151 --delay 0.5
+"""
+import argparse
+import asyncio
+import uuid
+from typing import Optional
+
+from mcp.server.fastmcp import FastMCP
+
+from task.utils import serialization
+
+
+def create_interpreter_server(port: int, delay: float) -> FastMCP:
+    server = FastMCP("fake-python-interpreter", host="127.0.0.1", port=port, stateless_http=True)
+
+    @server.tool()
+    async def execute_code(code: str, session_id: Optional[str] = None) -> str:
+        """Executes Python code in a stateful Jupyter kernel session. Returns output, result and generated files."""
+        await asyncio.sleep(delay)
+        return serialization.dumps({
+            "success": True,
+            "output": [f"executed {len(code)} chars"],
+            "result": "42",
+            "files": [],
+            "session_info": {"session_id": session_id or uuid.uuid4().hex},
+        })
+
+    return server
+
+
+def create_ddg_server(port: int, delay: float) -> FastMCP:
+    server = FastMCP("fake-ddg-search", host="127.0.0.1", port=port, stateless_http=True)
+
+    @server.tool()
+    async def search(query: str, max_results: int = 10) -> str:
+        """Searches DuckDuckGo and returns formatted results."""
+        await asyncio.sleep(delay)
+        return "\n\n".join(
+            f"{i + 1}. Result for '{query}'\nURL: https://example.com/{i}\nSummary: Lorem ipsum dolor sit amet."
+            for i in range(max_results)
+        )
+
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kind", choices=["interpreter", "ddg"], required=True)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    create_server = create_interpreter_server if args.kind == "interpreter" else create_ddg_server
+    create_server(args.port, args.delay).run(transport="streamable-http")
+
+
+if __name__ == "__main__":
+    main()
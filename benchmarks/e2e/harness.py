@@ -0,0 +1,151 @@
+"""Shared pieces of end-to-end benchmarks: fake servers lifecycle, streaming client and latency summary."""
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+import httpx
+
+from task.utils import serialization
+
+AGENT_DEPLOYMENT = "general-purpose-agent"
+FAKE_AGENT_MODEL = "bench-agent"
+
+
+@dataclass
+class RequestResult:
+    label: str
+    latency: float
+    ttft: Optional[float]
+    error: Optional[str] = None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@dataclass
+class Ports:
+    dial: int = field(default_factory=free_port)
+    interpreter: int = field(default_factory=free_port)
+    ddg: int = field(default_factory=free_port)
+    agent: int = field(default_factory=free_port)
+
+    @property
+    def agent_url(self) -> str:
+        return f"http://127.0.0.1:{self.agent}/openai/deployments/{AGENT_DEPLOYMENT}/chat/completions"
+
+
+def wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"Port {port} is not open after {timeout}s")
+
+
+@contextmanager
+def run_servers(
+        ports: Ports,
+        first_token_delay: float,
+        token_delay: float,
+        answer_tokens: int,
+        tool_delay: float,
+        verbose: bool = False,
+        extra_env: Optional[dict[str, str]] = None,
+) -> Iterator[None]:
+    """Starts fake DIAL core, fake MCP servers and the agent app pointed to them as subprocesses."""
+    python = sys.executable
+    env = {
+        **os.environ,
+        "DIAL_ENDPOINT": f"http://127.0.0.1:{ports.dial}",
+        "DEPLOYMENT_NAME": FAKE_AGENT_MODEL,
+        "PY_INTERPRETER_MCP_URL": f"http://127.0.0.1:{ports.interpreter}/mcp",
+        "DDG_MCP_URL": f"http://127.0.0.1:{ports.ddg}/mcp",
+        **(extra_env or {}),
+    }
+    commands = [
+        [python, "-m", "benchmarks.e2e.fake_dial", "--port", str(ports.dial), "--agent-deployment", FAKE_AGENT_MODEL,
+         "--first-token-delay", str(first_token_delay), "--token-delay", str(token_delay),
+         "--answer-tokens", str(answer_tokens)],
+        [python, "-m", "benchmarks.e2e.fake_mcp", "--kind", "interpreter", "--port", str(ports.interpreter),
+         "--delay", str(tool_delay)],
+        [python, "-m", "benchmarks.e2e.fake_mcp", "--kind", "ddg", "--port", str(ports.ddg),
+         "--delay", str(tool_delay)],
+    ]
+    output = None if verbose else subprocess.DEVNULL
+    processes = [subprocess.Popen(command, env=env, stdout=output) for command in commands]
+    try:
+        for port in (ports.dial, ports.interpreter, ports.ddg):
+            wait_for_port(port, timeout=30)
+        processes.append(subprocess.Popen(
+            [python, "-m", "uvicorn", "task.app:app", "--host", "127.0.0.1", "--port", str(ports.agent),
+             "--log-level", "warning"],
+            env=env,
+            stdout=output,
+        ))
+        wait_for_port(ports.agent, timeout=120)
+        yield
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+async def stream_request(
+        client: httpx.AsyncClient,
+        url: str,
+        body: dict[str, Any],
+        headers: dict[str, str],
+        label: str,
+) -> RequestResult:
+    """Sends streaming chat completion, TTFT is the time of the first content delta of the answer."""
+    start = time.perf_counter()
+    ttft = None
+    try:
+        async with client.stream("POST", url, json=body, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return RequestResult(label, time.perf_counter() - start, None, f"HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if ttft is not None or not line.startswith("data:") or line.endswith("[DONE]"):
+                    continue
+                chunk = serialization.loads(line[len("data:"):])
+                if "error" in chunk:
+                    return RequestResult(label, time.perf_counter() - start, ttft, str(chunk["error"]))
+                choices = chunk.get("choices") or []
+                if choices and (choices[0].get("delta") or {}).get("content"):
+                    ttft = time.perf_counter() - start
+    except httpx.HTTPError as e:
+        return RequestResult(label, time.perf_counter() - start, ttft, repr(e))
+    return RequestResult(label, time.perf_counter() - start, ttft)
+
+
+def percentile_ms(values: list[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return round(ordered[index] * 1000, 1)
+
+
+def summarize(results: list[RequestResult]) -> dict[str, Any]:
+    ok = [r for r in results if r.error is None]
+    latencies = [r.latency for r in ok]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "latency_ms": {p: percentile_ms(latencies, q) for p, q in (("p50", 50), ("p90", 90), ("p99", 99))},
+        "ttft_ms": {p: percentile_ms(ttfts, q) for p, q in (("p50", 50), ("p90", 90), ("p99", 99))},
+    }
@@ -0,0 +1,131 @@
+"""
+Replays traffic captured by TrafficCaptureMiddleware (TRAFFIC_CAPTURE_PATH) against a local agent instance.
+
+Requests are sent at their captured offsets divided by --speed (1 = original pace, 10 = ten times faster),
+with hashed api keys and conversation ids so per-key admission and per-conversation caches behave as in capture.
+By default the agent app is started with fake DIAL and MCP upstreams, use --target for an already running instance.
+Captured text is anonymized, so the fake model answers with plain text unless --scenarios assigns
+tool-call scripts to replayed requests round-robin.
+
+Run: python -m benchmarks.e2e.replay captures/traffic.jsonl --speed 5
+"""
+import argparse
+import asyncio
+import copy
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks.e2e.harness import Ports, RequestResult, percentile_ms, run_servers, stream_request, summarize
+from benchmarks.e2e.scenarios import SCENARIOS
+from task.utils import serialization
+
+
+def load_capture(path: str, limit: int | None = None) -> list[dict[str, Any]]:
+    records = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = serialization.loads(line)
+        if record.get("body"):
+            records.append(record)
+    records.sort(key=lambda r: r["offset_s"])
+    return records[:limit] if limit else records
+
+
+def _prepare_body(record: dict[str, Any], scenario: str | None) -> dict[str, Any]:
+    body = copy.deepcopy(record["body"])
+    body["stream"] = True
+    if scenario:
+        for message in reversed(body.get("messages") or []):
+            if message.get("role") == "user" and isinstance(message.get("content"), str):
+                message["content"] = f"[scenario:{scenario}] {message['content']}"
+                break
+    return body
+
+
+async def _replay(args: argparse.Namespace, url: str, records: list[dict[str, Any]]) -> tuple[list[RequestResult], float]:
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        warmup = await stream_request(
+            client, url, {"messages": [{"role": "user", "content": "warmup"}], "stream": True},
+            {"Api-Key": "warmup"}, label="warmup",
+        )
+        if warmup.error:
+            raise RuntimeError(f"Warmup request failed: {warmup.error}")
+
+        first_offset = records[0]["offset_s"]
+        start = time.perf_counter()
+
+        async def send_at(n: int, record: dict[str, Any]) -> RequestResult:
+            delay = (record["offset_s"] - first_offset) / args.speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario = args.scenarios[n % len(args.scenarios)] if args.scenarios else None
+            headers = {"Api-Key": record.get("api_key") or "replay"}
+            if record.get("conversation_id"):
+                headers["X-Conversation-Id"] = record["conversation_id"]
+            return await stream_request(client, url, _prepare_body(record, scenario), headers, label=scenario or "replay")
+
+        results = await asyncio.gather(*(send_at(n, record) for n, record in enumerate(records)))
+        return list(results), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capture", help="JSONL file written by TrafficCaptureMiddleware")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--limit", type=int, help="Replay only first N requests")
+    parser.add_argument("--target", help="Chat completions URL of running agent, fake upstreams are not started")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), help="Tool-call scripts for fake model")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--answer-tokens", type=int, default=100)
+    parser.add_argument("--tool-delay", type=float, default=0.2)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--verbose", action="store_true", help="Show output of servers")
+    args = parser.parse_args()
+
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        raise SystemExit(f"No requests in {args.capture}")
+
+    ports = Ports()
+    servers = nullcontext() if args.target else run_servers(
+        ports,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        answer_tokens=args.answer_tokens,
+        tool_delay=args.tool_delay,
+        verbose=args.verbose,
+    )
+    with servers:
+        results, duration = asyncio.run(_replay(args, args.target or ports.agent_url, records))
+
+    captured_ok = [r for r in records if r.get("status") == 200]
+    errors = sorted({r.error for r in results if r.error})
+    print(serialization.dumps({
+        "capture": args.capture,
+        "speed": args.speed,
+        "captured_span_s": round(records[-1]["offset_s"] - records[0]["offset_s"], 2),
+        "duration_s": round(duration, 2),
+        "throughput_rps": round(len(results) / duration, 2),
+        "replayed": summarize(results),
+        "captured": {
+            "requests": len(records),
+            "errors": len(records) - len(captured_ok),
+            "latency_ms": {
+                p: percentile_ms([r["duration_ms"] / 1000 for r in captured_ok], q)
+                for p, q in (("p50", 50), ("p90", 90), ("p99", 99))
+            },
+        },
+        "error_samples": errors[:5],
+    }, indent=True))
+
+
+if __name__ == "__main__":
+    main()
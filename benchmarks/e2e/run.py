@@ -0,0 +1,82 @@
+"""
+End-to-end benchmark of GeneralPurposeAgentApplication against local fake DIAL core and MCP servers.
+
+Starts fake servers and the agent app as subprocesses, sends scripted conversations at the configured concurrency
+and reports throughput, latency and time-to-first-token (first content delta of the agent answer).
+The first request is a warmup (tools creation, embedding model load) and is not measured.
+
+Run: python -m benchmarks.e2e.run --requests 200 --concurrency 16 --scenarios chat web_search python
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from benchmarks.e2e.harness import Ports, RequestResult, run_servers, stream_request, summarize
+from benchmarks.e2e.scenarios import SCENARIOS, user_message
+from task.utils import serialization
+
+
+async def _send(client: httpx.AsyncClient, url: str, scenario: str, n: int) -> RequestResult:
+    body = {"messages": [{"role": "user", "content": user_message(scenario, n)}], "stream": True}
+    headers = {"Api-Key": "bench-key", "X-Conversation-Id": uuid.uuid4().hex}
+    return await stream_request(client, url, body, headers, label=scenario)
+
+
+async def _run_load(args: argparse.Namespace, url: str) -> tuple[list[RequestResult], float]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        warmup = await _send(client, url, "chat", 0)
+        if warmup.error:
+            raise RuntimeError(f"Warmup request failed: {warmup.error}")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def send_limited(n: int) -> RequestResult:
+            async with semaphore:
+                return await _send(client, url, args.scenarios[n % len(args.scenarios)], n + 1)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(send_limited(n) for n in range(args.requests)))
+        return list(results), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["chat", "web_search", "python"])
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="Fake LLM delay before first chunk, s")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Fake LLM delay between chunks, s")
+    parser.add_argument("--answer-tokens", type=int, default=100)
+    parser.add_argument("--tool-delay", type=float, default=0.2, help="Fake MCP tool execution time, s")
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--verbose", action="store_true", help="Show output of servers")
+    args = parser.parse_args()
+
+    ports = Ports()
+    with run_servers(
+            ports,
+            first_token_delay=args.first_token_delay,
+            token_delay=args.token_delay,
+            answer_tokens=args.answer_tokens,
+            tool_delay=args.tool_delay,
+            verbose=args.verbose,
+    ):
+        results, duration = asyncio.run(_run_load(args, ports.agent_url))
+
+    errors = sorted({r.error for r in results if r.error})
+    print(serialization.dumps({
+        "concurrency": args.concurrency,
+        "duration_s": round(duration, 2),
+        "throughput_rps": round(len(results) / duration, 2),
+        **summarize(results),
+        "by_scenario": {s: summarize([r for r in results if r.label == s]) for s in args.scenarios},
+        "error_samples": errors[:5],
+    }, indent=True))
+
+
+if __name__ == "__main__":
+    main()
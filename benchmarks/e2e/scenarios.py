@@ -0,0 +1,62 @@
+"""
+Scripted conversations used by the fake LLM and the load generator.
+
+Each scenario is a list of steps, each step is a list of tool calls (name, arguments) the fake agent model
+makes in one assistant message. When the script is over the model streams the final answer.
+The scenario is selected by a `[scenario:<name>]` marker in the user message.
+"""
+import re
+
+BUCKET = "bench-bucket"
+DOCUMENT_URL = f"files/{BUCKET}/microwave_manual.txt"
+
+SCENARIOS: dict[str, list[list[tuple[str, dict]]]] = {
+    "chat": [],
+    "web_search": [
+        [("web_search", {"request": "weather in Kyiv today {n}"})],
+    ],
+    "ddg_search": [
+        [("search", {"query": "python asyncio gather cancellation {n}", "max_results": 5})],
+    ],
+    "python": [
+        [("execute_code", {"code": "import math\nprint(math.factorial({n} % 50))"})],
+    ],
+    "file": [
+        [("file_content_extraction", {"file_url": DOCUMENT_URL})],
+    ],
+    "rag": [
+        [("rag_search", {"request": "How to set the grill mode? ({n})", "file_url": DOCUMENT_URL})],
+    ],
+    "parallel": [
+        [
+            ("web_search", {"request": "latest python release {n}"}),
+            ("search", {"query": "python release notes {n}", "max_results": 3}),
+        ],
+        [("execute_code", {"code": "print(sum(range({n})))"})],
+    ],
+}
+
+_SCENARIO_PATTERN = re.compile(r"\[scenario:(\w+)]")
+
+
+def user_message(scenario: str, n: int) -> str:
+    """User message for n-th request of the scenario, n makes tool arguments unique to avoid cache hits."""
+    return f"[scenario:{scenario}] request #{n}: please help me with this task."
+
+
+def parse_user_message(content: str) -> tuple[str, int]:
+    match = _SCENARIO_PATTERN.search(content or "")
+    scenario = match.group(1) if match and match.group(1) in SCENARIOS else "chat"
+    n_match = re.search(r"#(\d+)", content or "")
+    return scenario, int(n_match.group(1)) if n_match else 0
+
+
+def tool_calls_for_step(scenario: str, n: int, step: int) -> list[tuple[str, dict]] | None:
+    """Tool calls for the step with {n} placeholders filled, None when the model should answer."""
+    script = SCENARIOS[scenario]
+    if step >= len(script):
+        return None
+    return [
+        (name, {k: v.replace("{n}", str(n)) if isinstance(v, str) else v for k, v in arguments.items()})
+        for name, arguments in script[step]
+    ]
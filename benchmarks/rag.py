@@ -0,0 +1,289 @@
+"""
+Micro-benchmark of RagTool pipeline pieces: splitting, embedding, FAISS index build and search,
+DocumentCache memory per document and the full tool call with mocked file download and LLM generation.
+
+Documents are tests/microwave_manual.txt and synthetic documents built from its paragraphs scaled up to
+the requested number of pages. Results are printed as JSON (and optionally written to --output) so runs with
+different chunk sizes, index types and encoder backends can be compared.
+
+Encoder backends are compared on the same documents, embedding parity is reported against the first one.
+
+Run: python -m benchmarks.rag --pages 10 100 1000 --chunk-sizes 500 1000 --indexes flat hnsw
+     python -m benchmarks.rag --encoders sentence-transformers onnx onnx-int8 --model-dir models/all-MiniLM-L6-v2
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+import faiss
+import numpy as np
+from aidial_client.types.chat.legacy.chat_completion import ToolCall, FunctionCall
+
+from task.tools.files import document_loader
+from task.tools.models import ToolCallParams
+from task.tools.rag import rag_tool
+from task.tools.rag.chunk_store import ChunkStore
+from task.tools.rag.document_cache import DocumentCache
+from task.tools.rag.encoders import TextEncoder, check_parity, create_encoder
+from task.tools.rag.rag_tool import RagTool
+from task.tools.rag.text_splitter import OffsetTextSplitter
+from task.utils import serialization
+
+_MANUAL_PATH = Path(__file__).parents[1] / "tests" / "microwave_manual.txt"
+_PAGE_CHARS = 3000
+_QUERIES = [
+    "How to set the grill mode?",
+    "What is the maximum power of the microwave?",
+    "How do I clean the inside of the oven?",
+    "Which containers are not safe to use?",
+    "How to set the clock?",
+    "What does error code E1 mean?",
+    "How to defrost meat by weight?",
+    "Can I use aluminium foil?",
+]
+
+
+def synthetic_document(pages: int, seed: int = 42) -> str:
+    """Document of `pages` pages (~3000 chars each) built from shuffled paragraphs of the manual."""
+    paragraphs = [p for p in _MANUAL_PATH.read_text(encoding="utf-8").split("\n\n") if p.strip()]
+    rnd = random.Random(seed)
+    parts: list[str] = []
+    size = 0
+    target = pages * _PAGE_CHARS
+    while size < target:
+        paragraph = rnd.choice(paragraphs)
+        parts.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(parts)[:target]
+
+
+def _splitter(chunk_size: int, chunk_overlap: int) -> OffsetTextSplitter:
+    return OffsetTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def _build_index(kind: str, embeddings: np.ndarray) -> faiss.Index:
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(embeddings.shape[1], 32)
+    elif kind == "ivf":
+        nlist = max(1, min(256, int(np.sqrt(len(embeddings)))))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(embeddings.shape[1]), embeddings.shape[1], nlist)
+        index.train(embeddings)
+        index.nprobe = min(8, nlist)
+    else:
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    return index
+
+
+def _percentiles_ms(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p99": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+    }
+
+
+def _chunks_bytes(chunks: list[str]) -> int:
+    return sys.getsizeof(chunks) + sum(sys.getsizeof(chunk) for chunk in chunks)
+
+
+def bench_pipeline(
+        model: TextEncoder,
+        text: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        index_kinds: list[str],
+        batch_size: int,
+        search_repeats: int,
+) -> list[dict[str, Any]]:
+    splitter = _splitter(chunk_size, chunk_overlap)
+    start = time.perf_counter()
+    chunks = splitter.split_text(text)
+    split_seconds = time.perf_counter() - start
+    chunk_store = ChunkStore.create(text, splitter.split_offsets(text))
+
+    start = time.perf_counter()
+    embeddings = model.encode(chunks, batch_size=batch_size)
+    embed_seconds = time.perf_counter() - start
+
+    query_encode_samples = []
+    for query in _QUERIES:
+        start = time.perf_counter()
+        model.encode([query])
+        query_encode_samples.append(time.perf_counter() - start)
+    query_embeddings = model.encode(_QUERIES)
+
+    results = []
+    for kind in index_kinds:
+        start = time.perf_counter()
+        index = _build_index(kind, embeddings)
+        build_seconds = time.perf_counter() - start
+
+        search_samples = []
+        for _ in range(search_repeats):
+            for query_embedding in query_embeddings:
+                start = time.perf_counter()
+                index.search(query_embedding.reshape(1, -1), k=3)
+                search_samples.append(time.perf_counter() - start)
+
+        index_bytes = faiss.serialize_index(index).nbytes
+        chunks_bytes = chunk_store.nbytes()
+        results.append({
+            "encoder": model.backend,
+            "chars": len(text),
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "chunks": len(chunks),
+            "index": kind,
+            "split_ms": round(split_seconds * 1000, 2),
+            "split_mb_per_s": round(len(text) / 1e6 / max(split_seconds, 1e-9), 2),
+            "embed_ms": round(embed_seconds * 1000, 2),
+            "embed_chunks_per_s": round(len(chunks) / max(embed_seconds, 1e-9), 1),
+            "query_encode_ms": _percentiles_ms(query_encode_samples),
+            "index_build_ms": round(build_seconds * 1000, 2),
+            "search_ms": _percentiles_ms(search_samples),
+            "cache_entry_bytes": {
+                "index": index_bytes,
+                "chunks": chunks_bytes,
+                "chunks_as_list": _chunks_bytes(chunks),
+                "total": index_bytes + chunks_bytes,
+            },
+        })
+    return results
+
+
+class _FakeStage:
+    def append_content(self, content: str) -> None:
+        pass
+
+    def append_name(self, name: str) -> None:
+        pass
+
+
+class _FakeExtractor:
+    documents: dict[str, str] = {}
+
+    def __init__(self, endpoint: str, api_key: str):
+        pass
+
+    def extract_pages(self, file_url: str) -> list[str]:
+        return [self.documents[file_url]]
+
+
+class _FakeDial:
+    """Stands in for AsyncDial, streams a fixed answer without network calls."""
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        async def stream():
+            for token in ["The ", "answer ", "is ", "in ", "the ", "manual."]:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        return stream()
+
+
+async def bench_tool(model: TextEncoder, text: str, repeats: int) -> dict[str, Any]:
+    """Full RagTool call: cold (extract, split, embed, index) and warm (DocumentCache hit) latency."""
+    tool = RagTool(endpoint="http://fake", deployment_name="fake", document_cache=DocumentCache(), model=model)
+    _FakeExtractor.documents = {"files/bench/doc.txt": text}
+
+    def params(n: int, conversation_id: str) -> ToolCallParams:
+        arguments = {"request": _QUERIES[n % len(_QUERIES)], "file_url": "files/bench/doc.txt"}
+        return ToolCallParams(
+            tool_call=ToolCall(
+                index=0,
+                id=f"call_{n}",
+                type="function",
+                function=FunctionCall(name=tool.name, arguments=serialization.dumps(arguments)),
+            ),
+            stage=_FakeStage(),
+            choice=None,
+            api_key="bench",
+            conversation_id=conversation_id,
+        )
+
+    cold_samples, warm_samples = [], []
+    with mock.patch.object(document_loader, "DialFileContentExtractor", _FakeExtractor), \
+            mock.patch.object(rag_tool, "AsyncDial", _FakeDial):
+        for n in range(repeats):
+            start = time.perf_counter()
+            await tool._execute(params(n, f"cold-{n}"))
+            cold_samples.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await tool._execute(params(n + 1, f"cold-{n}"))
+            warm_samples.append(time.perf_counter() - start)
+    return {"encoder": model.backend, "chars": len(text), "cold_ms": _percentiles_ms(cold_samples), "warm_ms": _percentiles_ms(warm_samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Synthetic document sizes, 0 means the manual as is")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500])
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--indexes", nargs="+", choices=["flat", "hnsw", "ivf"], default=["flat"])
+    parser.add_argument("--encoders", nargs="+", choices=["sentence-transformers", "onnx", "onnx-int8"],
+                        default=["sentence-transformers"], help="First one is the reference for parity")
+    parser.add_argument("--model-dir", help="Local ONNX model directory for onnx encoders")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--search-repeats", type=int, default=20)
+    parser.add_argument("--tool-repeats", type=int, default=3)
+    parser.add_argument("--output", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    encoders: dict[str, TextEncoder] = {}
+    encoder_info = {}
+    for backend in args.encoders:
+        start = time.perf_counter()
+        encoders[backend] = create_encoder(backend, args.model_dir)
+        encoders[backend].encode(["warmup"])
+        encoder_info[backend] = {"load_s": round(time.perf_counter() - start, 2)}
+
+    documents = {
+        pages: _MANUAL_PATH.read_text(encoding="utf-8") if pages == 0 else synthetic_document(pages)
+        for pages in [0] + args.pages
+    }
+
+    # Embedding parity of every backend with the first one (reference, sentence-transformers by default)
+    reference = encoders[args.encoders[0]]
+    parity_texts = _splitter(500, 50).split_text(documents[0])[:200]
+    for backend, encoder in encoders.items():
+        if encoder is not reference:
+            encoder_info[backend]["parity"] = check_parity(reference, encoder, parity_texts)
+
+    pipeline = []
+    tool = []
+    for encoder in encoders.values():
+        for pages, text in documents.items():
+            for chunk_size in args.chunk_sizes:
+                for result in bench_pipeline(
+                        encoder, text, chunk_size, args.chunk_overlap, args.indexes, args.batch_size,
+                        args.search_repeats,
+                ):
+                    pipeline.append({"pages": pages, **result})
+            if pages <= 100:
+                tool.append({"pages": pages, **asyncio.run(bench_tool(encoder, text, args.tool_repeats))})
+
+    report = serialization.dumps({
+        "model": "all-MiniLM-L6-v2",
+        "batch_size": args.batch_size,
+        "encoders": encoder_info,
+        "faiss": faiss.__version__,
+        "pipeline": pipeline,
+        "tool": tool,
+    }, indent=True)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
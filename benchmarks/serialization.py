@@ -0,0 +1,108 @@
+"""
+Microbenchmark of state and history JSON round-trips at realistic conversation sizes,
+stdlib json vs orjson (if installed) vs task.utils.serialization, which adds a pre-scan for long digit runs on loads
+and falls back to stdlib json for integers wider than 64 bits.
+
+Run: python -m benchmarks.serialization --turns 5 20 50
+"""
+import argparse
+import json
+import random
+import string
+import timeit
+
+from task.utils import serialization
+from task.utils.constants import TOOL_CALL_HISTORY_KEY
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _text(size: int, rnd: random.Random) -> str:
+    words = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(2, 9))) for _ in range(size // 6)]
+    return " ".join(words)[:size]
+
+
+def build_state(turns: int, tool_calls_per_turn: int = 2, tool_result_size: int = 3_000) -> dict:
+    """State with tool call history like the one agent stores in assistant message."""
+    rnd = random.Random(turns)
+    history = []
+    for turn in range(turns):
+        tool_calls = [
+            {
+                "index": i,
+                "id": f"call_{turn}_{i}",
+                "type": "function",
+                "function": {"name": "web_search", "arguments": json.dumps({"request": _text(60, rnd)})},
+            }
+            for i in range(tool_calls_per_turn)
+        ]
+        history.append({"role": "assistant", "tool_calls": tool_calls})
+        for tool_call in tool_calls:
+            history.append({
+                "role": "tool",
+                "name": "web_search",
+                "tool_call_id": tool_call["id"],
+                "content": _text(tool_result_size, rnd),
+            })
+    return {TOOL_CALL_HISTORY_KEY: history}
+
+
+def with_big_integer(state: dict) -> dict:
+    """Same state with one integer wider than 64 bits, takes the stdlib fallback path of the module."""
+    history = state[TOOL_CALL_HISTORY_KEY]
+    return {TOOL_CALL_HISTORY_KEY: [{**history[0], "id": 2 ** 70}] + history[1:]}
+
+
+def _backends() -> dict:
+    backends = {
+        "json": (lambda obj: json.dumps(obj), json.loads),
+    }
+    if orjson is not None:
+        backends["orjson"] = (lambda obj: orjson.dumps(obj).decode("utf-8"), orjson.loads)
+    backends[f"serialization[{serialization.BACKEND}]"] = (serialization.dumps, serialization.loads)
+    return backends
+
+
+def _roundtrip_ms(dumps, loads, state: dict, number: int) -> float | None:
+    try:
+        loads(dumps(state))
+    except (TypeError, ValueError):
+        # Backend can't serialize the state
+        return None
+    return round(timeit.timeit(lambda: loads(dumps(state)), number=number) / number * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    results = []
+    for turns in args.turns:
+        state = build_state(turns)
+        big_integer_state = with_big_integer(state)
+        payload_size = len(json.dumps(state))
+        for backend, (dumps, loads) in _backends().items():
+            # Per-message serialization as done for history in _prepare_messages
+            history = state[TOOL_CALL_HISTORY_KEY]
+            history_dumps = timeit.timeit(lambda: [dumps(m) for m in history], number=args.number) / args.number
+            results.append({
+                "turns": turns,
+                "backend": backend,
+                "state_bytes": payload_size,
+                # Whole state round-trip (set_state / state replayed from client)
+                "state_roundtrip_ms": _roundtrip_ms(dumps, loads, state, args.number),
+                # None when the backend can't serialize it
+                "big_integer_state_roundtrip_ms": _roundtrip_ms(dumps, loads, big_integer_state, args.number),
+                "history_dumps_ms": round(history_dumps * 1000, 3),
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
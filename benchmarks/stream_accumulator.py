@@ -0,0 +1,75 @@
+"""
+Compares per-delta streaming (one SSE frame per token, `content += delta`) with StreamAccumulator.
+
+Run: python -m benchmarks.stream_accumulator --tokens 20000
+"""
+import argparse
+import json
+import time
+
+from task.utils.stream_accumulator import StreamAccumulator
+
+
+class _FrameCounter:
+    """Stands in for choice/stage append_content, serializes each frame like an SSE chunk."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    def __call__(self, text: str) -> None:
+        frame = "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": text}}]}) + "\n\n"
+        self.frames += 1
+        self.bytes += len(frame)
+
+
+def _tokens(count: int) -> list[str]:
+    words = ["The ", "microwave ", "oven ", "supports ", "grill ", "mode, ", "defrost ", "and ", "timer. "]
+    return [words[i % len(words)] for i in range(count)]
+
+
+def _per_delta(tokens: list[str]) -> tuple[_FrameCounter, str]:
+    emit = _FrameCounter()
+    content = ""
+    for token in tokens:
+        emit(token)
+        content += token
+    return emit, content
+
+
+def _accumulated(tokens: list[str], max_chars: int) -> tuple[_FrameCounter, str]:
+    emit = _FrameCounter()
+    with StreamAccumulator(emit, max_chars=max_chars) as accumulator:
+        for token in tokens:
+            accumulator.append(token)
+    return emit, accumulator.content
+
+
+def _measure(fn, *args) -> tuple[_FrameCounter, float]:
+    start = time.process_time()
+    emit, _ = fn(*args)
+    return emit, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--max-chars", type=int, default=256)
+    args = parser.parse_args()
+
+    tokens = _tokens(args.tokens)
+    assert _per_delta(tokens)[1] == _accumulated(tokens, args.max_chars)[1]
+
+    baseline, baseline_cpu = _measure(_per_delta, tokens)
+    batched, batched_cpu = _measure(_accumulated, tokens, args.max_chars)
+
+    print(json.dumps({
+        "tokens": args.tokens,
+        "per_delta": {"frames": baseline.frames, "bytes": baseline.bytes, "cpu_ms": round(baseline_cpu * 1000, 2)},
+        "accumulated": {"frames": batched.frames, "bytes": batched.bytes, "cpu_ms": round(batched_cpu * 1000, 2)},
+        "frame_reduction": round(baseline.frames / max(batched.frames, 1), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
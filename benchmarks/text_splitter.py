@@ -0,0 +1,80 @@
+"""
+Compares langchain RecursiveCharacterTextSplitter with OffsetTextSplitter on large inputs
+and checks that both produce identical chunks.
+
+Inputs are built from tests/microwave_manual.txt in three layouts: paragraphs as is, single newlines only
+and one flat line (all splitting happens on sentences and words).
+
+Run: python -m benchmarks.text_splitter --sizes-mb 1 10 --chunk-size 500 --chunk-overlap 50
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from task.tools.rag.text_splitter import OffsetTextSplitter
+
+_MANUAL_PATH = Path(__file__).parents[1] / "tests" / "microwave_manual.txt"
+
+
+def _inputs(size_mb: float) -> dict[str, str]:
+    manual = _MANUAL_PATH.read_text(encoding="utf-8")
+    repeats = max(1, int(size_mb * 1_000_000 / len(manual)))
+    return {
+        "paragraphs": manual * repeats,
+        "lines": manual.replace("\n\n", "\n") * repeats,
+        "flat": manual.replace("\n", " ") * repeats,
+    }
+
+
+def _best_of(fn, text: str, repeats: int) -> tuple[float, list]:
+    best = float("inf")
+    result = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    langchain_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    offset_splitter = OffsetTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+    results = []
+    for size_mb in args.sizes_mb:
+        for layout, text in _inputs(size_mb).items():
+            langchain_seconds, langchain_chunks = _best_of(langchain_splitter.split_text, text, args.repeats)
+            offset_seconds, offset_chunks = _best_of(offset_splitter.split_text, text, args.repeats)
+            offsets_only_seconds, _ = _best_of(offset_splitter.split_offsets, text, args.repeats)
+            if langchain_chunks != offset_chunks:
+                raise AssertionError(f"Chunks differ for {layout} layout of {size_mb} MB")
+            results.append({
+                "layout": layout,
+                "mb": round(len(text) / 1e6, 2),
+                "chunks": len(offset_chunks),
+                "langchain_mb_per_s": round(len(text) / 1e6 / langchain_seconds, 1),
+                "offset_mb_per_s": round(len(text) / 1e6 / offset_seconds, 1),
+                "offsets_only_mb_per_s": round(len(text) / 1e6 / offsets_only_seconds, 1),
+                "speedup": round(langchain_seconds / offset_seconds, 2),
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
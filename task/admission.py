@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import deque
+from typing import Optional
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request can't be admitted, `retry_after` is a hint in seconds for the client."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Admission layer for agent requests.
+
+    At most `max_concurrency` requests run at once. Others wait in a queue bounded by `max_queue_size`
+    and are rejected immediately when it's full, or after `queue_timeout` seconds of waiting.
+    Free slots are handed out with weighted fair share between keys (API keys): the waiting key with
+    the lowest `running requests / weight` goes first, FIFO within a key. So one key running a batch
+    script can't starve the others. Weights must be positive.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            max_queue_size: int,
+            queue_timeout: float,
+            weights: Optional[dict[str, float]] = None,
+            default_weight: float = 1.0,
+    ):
+        invalid_weights = {k: w for k, w in (weights or {}).items() if not w > 0}
+        if invalid_weights or not default_weight > 0:
+            raise ValueError(f"Admission weights must be positive, got {invalid_weights or default_weight}")
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self._running = 0
+        self._running_by_key: dict[str, int] = {}
+        self._waiters: dict[str, deque[asyncio.Future]] = {}
+        self._queued = 0
+        # Moving average of request duration, used for Retry-After estimation
+        self._avg_duration = 5.0
+        self._started_at: dict[int, float] = {}
+        self._tickets = itertools.count()
+
+    async def acquire(self, key: str) -> int:
+        """
+        Wait for a slot for the key.
+
+        Returns:
+            Ticket that must be passed to `release`
+
+        Raises:
+            AdmissionRejectedError: queue is full or waiting took longer than `queue_timeout`
+        """
+        if self._running < self.max_concurrency and not self._queued:
+            return self._grant(key)
+
+        if self._queued >= self.max_queue_size:
+            raise AdmissionRejectedError("Too many requests, queue is full", self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        self._queued += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                return future.result()
+            raise AdmissionRejectedError("Too many requests, timed out waiting in queue", self._retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted right before cancellation, give it back
+                self.release(key, future.result())
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+                self._remove_waiter(key, future)
+
+    def release(self, key: str, ticket: int) -> None:
+        started_at = self._started_at.pop(ticket, None)
+        if started_at is not None:
+            self._avg_duration = 0.9 * self._avg_duration + 0.1 * (time.monotonic() - started_at)
+        self._running -= 1
+        self._running_by_key[key] -= 1
+        if not self._running_by_key[key]:
+            del self._running_by_key[key]
+        self._dispatch()
+
+    def stats(self) -> dict[str, int]:
+        return {"running": self._running, "queued": self._queued, "keys": len(self._running_by_key)}
+
+    def _grant(self, key: str) -> int:
+        self._running += 1
+        self._running_by_key[key] = self._running_by_key.get(key, 0) + 1
+        ticket = next(self._tickets)
+        self._started_at[ticket] = time.monotonic()
+        return ticket
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency and self._queued:
+            key = min(
+                self._waiters,
+                key=lambda k: self._running_by_key.get(k, 0) / self.weights.get(k, self.default_weight),
+            )
+            future = self._waiters[key].popleft()
+            self._queued -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+            future.set_result(self._grant(key))
+
+    def _remove_waiter(self, key: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(key)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[key]
+
+    def _retry_after(self) -> int:
+        # Time to drain the queue at the current pace
+        return max(1, math.ceil(self._avg_duration * (self._queued + 1) / self.max_concurrency))
@@ -1,16 +1,24 @@
 import asyncio
-import json
 from typing import Any
 
 from aidial_client import AsyncDial
 from aidial_client.types.chat.legacy.chat_completion import CustomContent, ToolCall
 from aidial_sdk.chat_completion import Message, Role, Choice, Request, Response
 
-from task.tools.base import BaseTool
+from task.tools.limits import ToolExecutionLimits
+from task.tools.memo import ToolCallMemo
 from task.tools.models import ToolCallParams
+from task.tools.registry import ToolRegistry
+from task.tools.result_store import ToolResultStore
+from task.routing import AGENT_ROUTE
+from task.tools.selector import ToolSelector
+from task.upstream import UpstreamPolicy
 from task.utils.constants import TOOL_CALL_HISTORY_KEY
 from task.utils.history import unpack_messages
+from task.utils.state_store import StateCodec
 from task.utils.stage import StageProcessor
+from task.utils.stream_accumulator import StreamAccumulator
+from task.utils import serialization
 
 
 class GeneralPurposeAgent:
@@ -19,14 +27,35 @@ class GeneralPurposeAgent:
             self,
             endpoint: str,
             system_prompt: str,
-            tools: list[BaseTool],
+            tool_registry: ToolRegistry,
+            tool_call_memo: ToolCallMemo | None = None,
+            speculative_tool_execution: bool = False,
+            tool_limits: ToolExecutionLimits | None = None,
+            result_store: ToolResultStore | None = None,
+            tool_selector: ToolSelector | None = None,
+            state_codec: StateCodec | None = None,
+            upstream_policy: UpstreamPolicy | None = None,
+            deployments: dict[str, str] | None = None,
     ):
         self.endpoint = endpoint
         self.system_prompt = system_prompt
-        self.tools = tools
-        
-        # Prepare tools_dict for faster lookup by tool name
-        self._tools_dict: dict[str, BaseTool] = {tool.name: tool for tool in tools}
+        self.tool_registry = tool_registry
+        self.tool_call_memo = tool_call_memo
+        # Start tool calls while the LLM is still streaming the remaining ones
+        self.speculative_tool_execution = speculative_tool_execution
+        self.tool_limits = tool_limits
+        self.result_store = result_store
+        # Send only tools relevant to the user message, selected once per request
+        self.tool_selector = tool_selector
+        self._selected_tool_names: set[str] | None = None
+        # Controls how tool call history is kept in the assistant message state (inline, compressed or server-side)
+        self.state_codec = state_codec or StateCodec()
+        # Message states unpacked once per request, reused by every round
+        self._unpacked_states: list[dict[str, Any] | None] | None = None
+        # Timeouts, retries and hedging of LLM calls
+        self.upstream_policy = upstream_policy or UpstreamPolicy()
+        # Deployments of auxiliary LLM calls made by tools, resolved for the request by ModelRouter
+        self.deployments = deployments
         
         # Create state dict with tool call history
         self.state: dict[str, Any] = {TOOL_CALL_HISTORY_KEY: []}
@@ -39,48 +68,72 @@ class GeneralPurposeAgent:
         client = AsyncDial(
             base_url=self.endpoint,
             api_key=api_key,
+            **self.upstream_policy.client_options(),
         )
         
         # 2. Create chunks with chat completions
-        messages = self._prepare_messages(request.messages)
-        tool_schemas = [tool.schema for tool in self.tools] if self.tools else None
-        
-        chunks = await client.chat.completions.create(
-            messages=messages,
-            tools=tool_schemas,
-            deployment_name=deployment_name,
-            stream=True,
+        messages = await self._prepare_messages(request.messages)
+        tool_schemas = await self._select_tool_schemas(request.messages)
+        
+        chunks = await self.upstream_policy.stream(
+            lambda: client.chat.completions.create(
+                messages=messages,
+                tools=tool_schemas,
+                deployment_name=deployment_name,
+                stream=True,
+            ),
+            route=AGENT_ROUTE,
+            deployment=deployment_name,
         )
         
-        # 3. Create tool_call_index_map and content collector
+        # 3. Create tool_call_index_map, content collector and speculatively started tool calls
+        conversation_id = request.headers.get("x-conversation-id", "")
         tool_call_index_map: dict[int, Any] = {}
-        content = ""
+        speculative_calls: dict[int, tuple[dict[str, Any], asyncio.Task]] = {}
+        content_accumulator = StreamAccumulator(choice.append_content)
         
         # 4. Async loop through chunks
-        async for chunk in chunks:
-            if chunk.choices:
-                delta = chunk.choices[0].delta
-                if delta:
-                    # Handle content streaming
-                    if delta.content:
-                        choice.append_content(delta.content)
-                        content += delta.content
-                    
-                    # Handle tool calls streaming
-                    if delta.tool_calls:
-                        for tool_call_delta in delta.tool_calls:
-                            if tool_call_delta.id:
-                                # First chunk of tool call - add to map
-                                tool_call_index_map[tool_call_delta.index] = tool_call_delta
-                            else:
-                                # Subsequent chunks - append arguments
-                                existing_tool_call = tool_call_index_map.get(tool_call_delta.index)
-                                if existing_tool_call and tool_call_delta.function:
-                                    argument_chunk = tool_call_delta.function.arguments or ""
-                                    if existing_tool_call.function:
-                                        existing_tool_call.function.arguments = (
-                                            (existing_tool_call.function.arguments or "") + argument_chunk
-                                        )
+        try:
+            async for chunk in chunks:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta
+                    if delta:
+                        # Handle content streaming
+                        if delta.content:
+                            content_accumulator.append(delta.content)
+                        
+                        # Handle tool calls streaming
+                        if delta.tool_calls:
+                            for tool_call_delta in delta.tool_calls:
+                                if tool_call_delta.id:
+                                    # First chunk of tool call - add to map
+                                    tool_call_index_map[tool_call_delta.index] = tool_call_delta
+                                else:
+                                    # Subsequent chunks - append arguments
+                                    existing_tool_call = tool_call_index_map.get(tool_call_delta.index)
+                                    if existing_tool_call and tool_call_delta.function:
+                                        argument_chunk = tool_call_delta.function.arguments or ""
+                                        if existing_tool_call.function:
+                                            existing_tool_call.function.arguments = (
+                                                (existing_tool_call.function.arguments or "") + argument_chunk
+                                            )
+                            
+                            # Start tool calls whose arguments are already complete
+                            if self.speculative_tool_execution:
+                                self._start_ready_tool_calls(
+                                    tool_call_index_map, speculative_calls, choice, api_key, conversation_id
+                                )
+                
+                # Don't hold back pending content while chunks carry no text
+                content_accumulator.tick()
+        except BaseException:
+            await self._cancel_tasks([task for _, task in speculative_calls.values()])
+            raise
+        finally:
+            # Tools may write to choice too, pending content must go first
+            content_accumulator.flush()
+        
+        content = content_accumulator.content
         
         # 5. Create assistant_message
         tool_calls_list = None
@@ -97,16 +150,26 @@ class GeneralPurposeAgent:
         
         # 6. Check if we need to process tool calls
         if assistant_message.tool_calls:
-            conversation_id = request.headers.get("x-conversation-id", "")
-            
-            # Create tasks for parallel tool execution
-            tasks = [
-                self._process_tool_call(tool_call, choice, api_key, conversation_id)
-                for tool_call in assistant_message.tool_calls
-            ]
+            # Join speculatively started calls, start the rest in parallel
+            tasks = []
+            for index, tool_call in zip(tool_call_index_map.keys(), assistant_message.tool_calls):
+                started_arguments, task = speculative_calls.pop(index, (None, None))
+                if task is not None and started_arguments != self._parse_arguments(tool_call.function.arguments):
+                    # Arguments kept streaming after they looked complete, discard speculative run
+                    await self._cancel_tasks([task])
+                    task = None
+                if task is None:
+                    task = asyncio.create_task(
+                        self._process_tool_call(tool_call, choice, api_key, conversation_id)
+                    )
+                tasks.append(task)
             
-            # Execute tasks in parallel
-            tool_messages = await asyncio.gather(*tasks)
+            # Execute tasks in parallel, if the turn is aborted don't leave sibling calls running
+            try:
+                tool_messages = await asyncio.gather(*tasks)
+            except BaseException:
+                await self._cancel_tasks(tasks)
+                raise
             
             # Update state with assistant message and tool responses
             self.state[TOOL_CALL_HISTORY_KEY].append(
@@ -118,58 +181,162 @@ class GeneralPurposeAgent:
             return await self.handle_request(deployment_name, choice, request, response)
         
         # 7. No tool calls - set state and return final message
-        choice.set_state(self.state)
+        choice.set_state(await self.state_codec.pack_async(self.state, conversation_id))
         return assistant_message
 
-    def _prepare_messages(self, messages: list[Message]) -> list[dict[str, Any]]:
-        # 1. Unpack messages
-        unpacked = unpack_messages(messages, self.state.get(TOOL_CALL_HISTORY_KEY, []))
+    def _start_ready_tool_calls(
+            self,
+            tool_call_index_map: dict[int, Any],
+            speculative_calls: dict[int, tuple[dict[str, Any], asyncio.Task]],
+            choice: Choice,
+            api_key: str,
+            conversation_id: str,
+    ) -> None:
+        """Starts execution of streamed tool calls as soon as their arguments form a complete JSON object."""
+        for index, tool_call_delta in tool_call_index_map.items():
+            if index in speculative_calls or not tool_call_delta.function:
+                continue
+            arguments = self._parse_arguments(tool_call_delta.function.arguments)
+            if not tool_call_delta.function.name or arguments is None:
+                continue
+            tool_call = ToolCall.validate(tool_call_delta)
+            # Parsed arguments are kept, formatting streamed after the closing brace doesn't discard the run
+            speculative_calls[index] = (
+                arguments,
+                asyncio.create_task(self._process_tool_call(tool_call, choice, api_key, conversation_id)),
+            )
+
+    @staticmethod
+    def _parse_arguments(arguments: str | None) -> dict[str, Any] | None:
+        """Arguments as dict once they form a complete JSON object, None while they are partial."""
+        # Only a closed JSON object can be parsed, partial arguments always fail
+        if not arguments or not arguments.rstrip().endswith("}"):
+            return None
+        try:
+            parsed = serialization.loads(arguments)
+        except ValueError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    @staticmethod
+    async def _cancel_tasks(tasks: list[asyncio.Task]) -> None:
+        """Cancels tool call tasks and waits until they finish, so their stages are closed and errors are seen."""
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"[GeneralPurposeAgent] Cancelled tool call failed: {result}")
+
+    async def _select_tool_schemas(self, messages: list[Message]) -> list[Any] | None:
+        if not len(self.tool_registry):
+            return None
+        if self.tool_selector is None:
+            return self.tool_registry.schemas
+        
+        # Tools already used in the conversation always stay included
+        used_tool_names = await self._used_tool_names(messages)
+        if self._selected_tool_names is None:
+            query = next(
+                (m.content for m in reversed(messages) if m.role == Role.USER and isinstance(m.content, str)),
+                "",
+            )
+            self._selected_tool_names = await self.tool_selector.select(query, used_tool_names)
+        return self.tool_registry.schemas_for(self._selected_tool_names | used_tool_names)
+
+    async def _message_states(self, messages: list[Message]) -> list[dict[str, Any] | None]:
+        """Rehydrated state of each assistant message (None for others), unpacked concurrently once per request."""
+        if self._unpacked_states is None:
+            async def unpack(message: Message) -> dict[str, Any] | None:
+                if message.role == Role.ASSISTANT and message.custom_content and isinstance(message.custom_content.state, dict):
+                    return await self.state_codec.unpack_async(message.custom_content.state)
+                return None
+            
+            self._unpacked_states = list(await asyncio.gather(*(unpack(message) for message in messages)))
+        return self._unpacked_states
+
+    async def _used_tool_names(self, messages: list[Message]) -> set[str]:
+        history: list[dict[str, Any]] = list(self.state.get(TOOL_CALL_HISTORY_KEY, []))
+        for state in await self._message_states(messages):
+            if state:
+                state_history = state.get(TOOL_CALL_HISTORY_KEY)
+                if isinstance(state_history, list):
+                    history.extend(state_history)
+        return {
+            tool_call["function"]["name"]
+            for history_msg in history
+            for tool_call in history_msg.get("tool_calls") or []
+            if tool_call.get("function", {}).get("name")
+        }
+
+    async def _prepare_messages(self, messages: list[Message]) -> list[dict[str, Any]]:
+        # 1. Unpack messages, assistant message states are rehydrated only on the first round
+        unpacked = unpack_messages(
+            messages,
+            self.state.get(TOOL_CALL_HISTORY_KEY, []),
+            self.state_codec,
+            unpacked_states=await self._message_states(messages),
+        )
         
         # 2. Insert system prompt as first message
         unpacked.insert(0, {"role": "system", "content": self.system_prompt})
         
-        # 3. Print history for debugging
-        for msg in unpacked:
-            print(json.dumps(msg, default=str))
-        
-        # 4. Return unpacked messages
+        # 3. Return unpacked messages
         return unpacked
 
     async def _process_tool_call(self, tool_call: ToolCall, choice: Choice, api_key: str, conversation_id: str) -> dict[str, Any]:
         # 1. Get tool name
         tool_name = tool_call.function.name
         
-        # 2. Open stage
-        stage = StageProcessor.open_stage(choice, tool_name)
-        
-        # 3. Get tool from tools dict
-        tool = self._tools_dict.get(tool_name)
-        
-        if tool:
-            # 4. Show request in stage if enabled
-            if tool.show_in_stage:
-                stage.append_content("## Request arguments: \n")
-                stage.append_content(
-                    f"```json\n\r{json.dumps(json.loads(tool_call.function.arguments), indent=2)}\n\r```\n\r"
-                )
-                stage.append_content("## Response: \n")
-            
-            # 5. Execute tool
-            tool_call_params = ToolCallParams(
-                tool_call=tool_call,
-                stage=stage,
-                choice=choice,
-                api_key=api_key,
-                conversation_id=conversation_id,
-            )
-            tool_message = await tool.execute(tool_call_params)
-        else:
-            # Tool not found
-            tool_message = Message(
+        # 2. Get tool from registry and validate arguments before any tool work starts
+        tool = self.tool_registry.get(tool_name)
+        if not tool:
+            return Message(
                 role=Role.TOOL,
                 content=f"Error: Tool '{tool_name}' not found",
                 tool_call_id=tool_call.id,
+            ).dict(exclude_none=True)
+        
+        validation_error = self.tool_registry.validate(tool_name, tool_call.function.arguments)
+        if validation_error:
+            # Model gets the error to fix its call, no stage is shown for a call that never runs
+            return Message(
+                role=Role.TOOL,
+                content=f"Error: Invalid arguments for tool '{tool_name}': {validation_error}. "
+                        f"Fix the arguments according to the tool schema and call it again.",
+                tool_call_id=tool_call.id,
+            ).dict(exclude_none=True)
+        
+        # 3. Open stage
+        stage = StageProcessor.open_stage(choice, tool_name)
+        
+        # 4. Show request in stage if enabled
+        if tool.show_in_stage:
+            stage.append_content("## Request arguments: \n")
+            stage.append_content(
+                f"```json\n\r{serialization.dumps(serialization.loads(tool_call.function.arguments), indent=True)}\n\r```\n\r"
             )
+            stage.append_content("## Response: \n")
+        
+        # 5. Execute tool
+        tool_call_params = ToolCallParams(
+            tool_call=tool_call,
+            stage=stage,
+            choice=choice,
+            api_key=api_key,
+            conversation_id=conversation_id,
+            memo=self.tool_call_memo,
+            result_store=self.result_store,
+            deployments=self.deployments,
+        )
+        try:
+            if self.tool_limits:
+                tool_message = await self.tool_limits.execute(tool, tool_call_params)
+            else:
+                tool_message = await tool.execute(tool_call_params)
+        except asyncio.CancelledError:
+            # Discarded speculative call or aborted turn, stage must not stay open
+            StageProcessor.close_stage_safely(stage)
+            raise
         
         # 6. Close stage
         StageProcessor.close_stage_safely(stage)
@@ -1,32 +1,224 @@
+import asyncio
 import os
 
 import uvicorn
 from aidial_sdk import DIALApp
 from aidial_sdk.chat_completion import ChatCompletion, Request, Response
+from aidial_sdk.exceptions import HTTPException
 
+from task.admission import AdmissionController, AdmissionRejectedError
 from task.agent import GeneralPurposeAgent
+from task.prefork import run_prefork
 from task.prompts import SYSTEM_PROMPT
+from task.routing import ModelRouter, AGENT_ROUTE, RAG_ROUTE, WEB_SEARCH_ROUTE
 from task.tools.base import BaseTool
 from task.tools.deployment.image_generation_tool import ImageGenerationTool
 from task.tools.deployment.web_search_tool import WebSearchTool
+from task.tools.files.document_loader import DocumentLoader
 from task.tools.files.file_content_extraction_tool import FileContentExtractionTool
+from task.tools.files.tool_result_reader_tool import ToolResultReaderTool
+from task.tools.limits import ToolExecutionLimits
+from task.tools.memo import ToolCallMemo
 from task.tools.py_interpreter.python_code_interpreter_tool import PythonCodeInterpreterTool
 from task.tools.mcp.mcp_client import MCPClient
 from task.tools.mcp.mcp_tool import MCPTool
+from task.tools.rag.answer_cache import SemanticAnswerCache
 from task.tools.rag.document_cache import DocumentCache
+from task.tools.rag.encoders import TextEncoder, create_encoder
+from task.tools.rag.prefetch import AttachmentPrefetcher
 from task.tools.rag.rag_tool import RagTool
+from task.tools.registry import ToolRegistry
+from task.tools.result_store import ToolResultStore, READ_TOOL_RESULT_NAME
+from task.tools.selector import ToolSelector
+from task.traffic_capture import TrafficCaptureMiddleware
+from task.upstream import UpstreamPolicy
+from task.utils.history import latest_attachments
+from task.utils.state_store import StateCodec, StateStore, FileStateStore, RedisStateStore
+from task.utils.ttl_cache import TTLCache
 
 DIAL_ENDPOINT = os.getenv('DIAL_ENDPOINT', "http://localhost:8080")
 # DEPLOYMENT_NAME = os.getenv('DEPLOYMENT_NAME', 'gpt-4o')
 DEPLOYMENT_NAME = os.getenv('DEPLOYMENT_NAME', 'claude-sonnet-3-7')
 
+# Deployments of LLM calls per route, format: "rag=gpt-4o-mini,web_search=gemini-2.5-flash".
+# Unset routes use DEPLOYMENT_NAME (agent, rag) and gemini-2.5-pro (web_search, needs Google Search grounding).
+# With MODEL_ROUTE_HEADER_OVERRIDES requests can override rag and web_search routes with the same format
+# in `X-Model-Routes` header, to deployments listed in MODEL_ROUTE_OVERRIDE_DEPLOYMENTS (comma-separated,
+# by default the configured ones). The agent route can't be overridden
+MODEL_ROUTES = os.getenv('MODEL_ROUTES', '')
+MODEL_ROUTE_HEADER_OVERRIDES = os.getenv('MODEL_ROUTE_HEADER_OVERRIDES', 'false').lower() == 'true'
+MODEL_ROUTE_OVERRIDE_DEPLOYMENTS = os.getenv('MODEL_ROUTE_OVERRIDE_DEPLOYMENTS', '')
+
+PY_INTERPRETER_MCP_URL = os.getenv('PY_INTERPRETER_MCP_URL', "http://localhost:8050/mcp")
+DDG_MCP_URL = os.getenv('DDG_MCP_URL', "http://localhost:8051/mcp")
+# Web search results are shared across conversations, TTL of 0 disables the cache
+WEB_SEARCH_CACHE_TTL = float(os.getenv('WEB_SEARCH_CACHE_TTL', '300'))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv('WEB_SEARCH_CACHE_SIZE', '512'))
+# Generated images reused for the same prompt and parameters within a conversation, TTL of 0 disables the cache.
+# Per-request API keys issued by DIAL can't scope it, requests without conversation id reuse images only
+# within the same key. IMAGE_CACHE_SHARED reuses images across all conversations and users
+IMAGE_CACHE_TTL = float(os.getenv('IMAGE_CACHE_TTL', '0'))
+IMAGE_CACHE_SIZE = int(os.getenv('IMAGE_CACHE_SIZE', '256'))
+IMAGE_CACHE_SHARED = os.getenv('IMAGE_CACHE_SHARED', 'false').lower() == 'true'
+# Identical tool calls within a conversation are reused for tools that opt in
+TOOL_MEMO_SIZE = int(os.getenv('TOOL_MEMO_SIZE', '1024'))
+DDG_MEMOIZE_TTL = float(os.getenv('DDG_MEMOIZE_TTL', '300'))
+# Start executing tool calls as soon as their arguments are streamed completely
+SPECULATIVE_TOOL_EXECUTION = os.getenv('SPECULATIVE_TOOL_EXECUTION', 'false').lower() == 'true'
+# Tool timeouts (seconds) and global concurrency limits, format: "tool_name=value,tool_name=value"
+TOOL_DEFAULT_TIMEOUT = float(os.getenv('TOOL_DEFAULT_TIMEOUT', '120'))
+TOOL_TIMEOUTS = os.getenv('TOOL_TIMEOUTS', 'execute_code=180,image_generation=90')
+TOOL_MAX_CONCURRENCY = os.getenv('TOOL_MAX_CONCURRENCY', 'execute_code=4,image_generation=2')
+# Warm PyInterpreter kernels kept in pool, idle conversation sessions are forgotten after TTL (seconds)
+INTERPRETER_SESSION_POOL_SIZE = int(os.getenv('INTERPRETER_SESSION_POOL_SIZE', '2'))
+INTERPRETER_SESSION_IDLE_TTL = float(os.getenv('INTERPRETER_SESSION_IDLE_TTL', '1800'))
+# Tool results longer than threshold (chars) are stored as DIAL files, 0 disables it
+TOOL_RESULT_STORE_THRESHOLD = int(os.getenv('TOOL_RESULT_STORE_THRESHOLD', '8000'))
+TOOL_RESULT_PREVIEW_CHARS = int(os.getenv('TOOL_RESULT_PREVIEW_CHARS', '2000'))
+# Send only top-k tools relevant to the user message (tools used in conversation are always sent), 0 disables it
+TOOL_SELECTION_TOP_K = int(os.getenv('TOOL_SELECTION_TOP_K', '0'))
+# Admission control for agent requests, weights format: "api_key=weight,api_key=weight"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', '32'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '64'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '30'))
+ADMISSION_KEY_WEIGHTS = os.getenv('ADMISSION_KEY_WEIGHTS', '')
+
+# Upstream LLM calls: connect / first token timeouts (seconds, 0 disables first token one), retries with jittered
+# exponential backoff and hedged second request after UPSTREAM_HEDGE_DELAY seconds without first token (0 disables it)
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '10'))
+UPSTREAM_FIRST_TOKEN_TIMEOUT = float(os.getenv('UPSTREAM_FIRST_TOKEN_TIMEOUT', '60'))
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', '2'))
+UPSTREAM_BACKOFF_BASE = float(os.getenv('UPSTREAM_BACKOFF_BASE', '0.5'))
+UPSTREAM_BACKOFF_MAX = float(os.getenv('UPSTREAM_BACKOFF_MAX', '8'))
+UPSTREAM_HEDGE_DELAY = float(os.getenv('UPSTREAM_HEDGE_DELAY', '0'))
+
+# inline | compressed | server
+STATE_MODE = os.getenv('STATE_MODE', 'inline')
+# file | redis, used by 'server' state mode
+STATE_STORE = os.getenv('STATE_STORE', 'file')
+STATE_STORE_DIR = os.getenv('STATE_STORE_DIR', '.state')
+STATE_REDIS_URL = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/1')
+# Seconds stored state is kept, by both file (expired by modification time) and redis stores
+STATE_TTL = int(os.getenv('STATE_TTL', str(7 * 24 * 3600)))
+
+# Cosine similarity for reusing RAG answers to similar questions about the same document, 0 disables the cache
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv('RAG_ANSWER_CACHE_THRESHOLD', '0.9'))
+
+# Download, extract and index files attached to the incoming message before the model asks for them, 0 disables it
+ATTACHMENT_PREFETCH_CONCURRENCY = int(os.getenv('ATTACHMENT_PREFETCH_CONCURRENCY', '2'))
+# Extracted file text shared by file tools and prefetch, TTL of 0 disables the cache
+EXTRACTED_CONTENT_CACHE_TTL = float(os.getenv('EXTRACTED_CONTENT_CACHE_TTL', '600'))
+EXTRACTED_CONTENT_CACHE_SIZE = int(os.getenv('EXTRACTED_CONTENT_CACHE_SIZE', '32'))
+
+# sentence-transformers | onnx | onnx-int8, ONNX model is loaded from EMBEDDING_MODEL_DIR
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'sentence-transformers')
+EMBEDDING_MODEL_DIR = os.getenv('EMBEDDING_MODEL_DIR', '')
+
+# Number of worker processes forked after the embedding model is loaded, document indexes are shared via mmap files
+WORKERS = int(os.getenv('WORKERS', '1'))
+DOCUMENT_CACHE_DIR = os.getenv(
+    'DOCUMENT_CACHE_DIR',
+    '/dev/shm/gpa-document-cache' if WORKERS > 1 and os.path.isdir('/dev/shm') else '',
+)
+
+# Opt-in capture of anonymized requests for replay load tests
+TRAFFIC_CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH', '')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', '1.0'))
+
+
+def _parse_settings(value: str) -> dict[str, str]:
+    settings = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            settings[name.strip()] = setting.strip()
+    return settings
+
+
+def _create_state_codec() -> StateCodec:
+    store: StateStore | None = None
+    if STATE_MODE == 'server':
+        if STATE_STORE == 'redis':
+            store = RedisStateStore(url=STATE_REDIS_URL, ttl_seconds=STATE_TTL)
+        else:
+            store = FileStateStore(directory=STATE_STORE_DIR, ttl_seconds=STATE_TTL)
+    return StateCodec(mode=STATE_MODE, store=store)
+
+
+def _embedding_threads() -> int | None:
+    # Split CPU cores between workers instead of each of them using all cores for embeddings
+    return max(1, (os.cpu_count() or 1) // WORKERS) if WORKERS > 1 else None
+
+
+def _init_worker(worker_id: int) -> None:
+    if EMBEDDING_BACKEND == 'sentence-transformers':
+        import torch
+        torch.set_num_threads(_embedding_threads())
+
 
 class GeneralPurposeAgentApplication(ChatCompletion):
 
     def __init__(self):
         self.tools: list[BaseTool] = []
+        self.tool_registry = ToolRegistry([])
+        self.tool_selector: ToolSelector | None = None
+        self.embedding_model: TextEncoder | None = None
+        self.tool_call_memo = ToolCallMemo(max_size=TOOL_MEMO_SIZE)
+        self.tool_limits = ToolExecutionLimits(
+            default_timeout=TOOL_DEFAULT_TIMEOUT,
+            timeouts={name: float(v) for name, v in _parse_settings(TOOL_TIMEOUTS).items()},
+            max_concurrency={name: int(v) for name, v in _parse_settings(TOOL_MAX_CONCURRENCY).items()},
+        )
+        self.result_store = ToolResultStore(
+            endpoint=DIAL_ENDPOINT,
+            threshold=TOOL_RESULT_STORE_THRESHOLD,
+            preview_chars=TOOL_RESULT_PREVIEW_CHARS,
+        ) if TOOL_RESULT_STORE_THRESHOLD > 0 else None
+        self.admission = AdmissionController(
+            max_concurrency=ADMISSION_MAX_CONCURRENCY,
+            max_queue_size=ADMISSION_MAX_QUEUE,
+            queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+            weights={key: float(v) for key, v in _parse_settings(ADMISSION_KEY_WEIGHTS).items()},
+        )
+        self.state_codec = _create_state_codec()
+        self.upstream_policy = UpstreamPolicy(
+            connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+            first_token_timeout=UPSTREAM_FIRST_TOKEN_TIMEOUT,
+            max_retries=UPSTREAM_MAX_RETRIES,
+            backoff_base=UPSTREAM_BACKOFF_BASE,
+            backoff_max=UPSTREAM_BACKOFF_MAX,
+            hedge_delay=UPSTREAM_HEDGE_DELAY,
+        )
+        self.document_loader = DocumentLoader(
+            endpoint=DIAL_ENDPOINT,
+            cache=TTLCache(
+                ttl_seconds=EXTRACTED_CONTENT_CACHE_TTL,
+                max_size=EXTRACTED_CONTENT_CACHE_SIZE,
+            ) if EXTRACTED_CONTENT_CACHE_TTL > 0 else None,
+        )
+        self.prefetcher: AttachmentPrefetcher | None = None
+        self.model_router = ModelRouter(
+            routes={
+                AGENT_ROUTE: DEPLOYMENT_NAME,
+                RAG_ROUTE: DEPLOYMENT_NAME,
+                WEB_SEARCH_ROUTE: 'gemini-2.5-pro',
+                **ModelRouter.parse(MODEL_ROUTES),
+            },
+            allow_header_overrides=MODEL_ROUTE_HEADER_OVERRIDES,
+            allowed_deployments={d.strip() for d in MODEL_ROUTE_OVERRIDE_DEPLOYMENTS.split(',') if d.strip()},
+        )
 
-    async def _get_mcp_tools(self, url: str) -> list[BaseTool]:
+    def preload(self) -> None:
+        """Loads embedding model, called before forking workers so its weights are shared between them."""
+        if self.embedding_model is None:
+            self.embedding_model = create_encoder(
+                EMBEDDING_BACKEND,
+                model_dir=EMBEDDING_MODEL_DIR or None,
+                num_threads=_embedding_threads(),
+            )
+            print(f"[GeneralPurposeAgentApplication] Loaded {self.embedding_model.backend} embedding model")
+
+    async def _get_mcp_tools(self, url: str, memoize_ttl: float | None = None) -> list[BaseTool]:
         # 1. Create list of BaseTool
         tools: list[BaseTool] = []
         
@@ -36,7 +228,7 @@ class GeneralPurposeAgentApplication(ChatCompletion):
         # 3. Get tools and add them to the list as MCPTool
         mcp_tools = await mcp_client.get_tools()
         for mcp_tool_model in mcp_tools:
-            tools.append(MCPTool(client=mcp_client, mcp_tool_model=mcp_tool_model))
+            tools.append(MCPTool(client=mcp_client, mcp_tool_model=mcp_tool_model, memoize_ttl=memoize_ttl))
         
         # 4. Return created tool list
         return tools
@@ -49,58 +241,132 @@ class GeneralPurposeAgentApplication(ChatCompletion):
         # We will add tools in later steps as they are implemented
         
         # 2. Add ImageGenerationTool with DIAL_ENDPOINT
-        tools.append(ImageGenerationTool(endpoint=DIAL_ENDPOINT))
+        tools.append(ImageGenerationTool(
+            endpoint=DIAL_ENDPOINT,
+            cache=TTLCache(ttl_seconds=IMAGE_CACHE_TTL, max_size=IMAGE_CACHE_SIZE) if IMAGE_CACHE_TTL > 0 else None,
+            share_cache_across_keys=IMAGE_CACHE_SHARED,
+            upstream_policy=self.upstream_policy,
+        ))
         
         # 2b. Add WebSearchTool with DIAL_ENDPOINT (uses Gemini with Google Search grounding)
-        tools.append(WebSearchTool(endpoint=DIAL_ENDPOINT))
+        tools.append(WebSearchTool(
+            endpoint=DIAL_ENDPOINT,
+            cache=TTLCache(ttl_seconds=WEB_SEARCH_CACHE_TTL, max_size=WEB_SEARCH_CACHE_SIZE),
+            upstream_policy=self.upstream_policy,
+            deployment_name=self.model_router.routes[WEB_SEARCH_ROUTE],
+        ))
         
-        # 3. Add FileContentExtractionTool with DIAL_ENDPOINT
-        tools.append(FileContentExtractionTool(endpoint=DIAL_ENDPOINT))
+        # 3. Add FileContentExtractionTool with DIAL_ENDPOINT and shared DocumentLoader
+        tools.append(FileContentExtractionTool(endpoint=DIAL_ENDPOINT, loader=self.document_loader))
         
-        # 4. Add RagTool with DIAL_ENDPOINT, DEPLOYMENT_NAME, and DocumentCache
-        document_cache = DocumentCache.create()
-        tools.append(RagTool(
+        # 4. Add RagTool with DIAL_ENDPOINT, routed deployment, DocumentCache and shared embedding model
+        document_cache = DocumentCache.create(directory=DOCUMENT_CACHE_DIR or None)
+        self.preload()
+        rag_tool = RagTool(
             endpoint=DIAL_ENDPOINT,
-            deployment_name=DEPLOYMENT_NAME,
-            document_cache=document_cache
-        ))
+            deployment_name=self.model_router.routes[RAG_ROUTE],
+            document_cache=document_cache,
+            model=self.embedding_model,
+            answer_cache=SemanticAnswerCache(threshold=RAG_ANSWER_CACHE_THRESHOLD) if RAG_ANSWER_CACHE_THRESHOLD > 0 else None,
+            loader=self.document_loader,
+            upstream_policy=self.upstream_policy,
+        )
+        tools.append(rag_tool)
+        if ATTACHMENT_PREFETCH_CONCURRENCY > 0:
+            self.prefetcher = AttachmentPrefetcher(rag_tool=rag_tool, max_concurrency=ATTACHMENT_PREFETCH_CONCURRENCY)
         
         # 5. Add PythonCodeInterpreterTool
         py_interpreter = await PythonCodeInterpreterTool.create(
-            mcp_url="http://localhost:8050/mcp",
+            mcp_url=PY_INTERPRETER_MCP_URL,
             tool_name="execute_code",
             dial_endpoint=DIAL_ENDPOINT,
+            session_pool_size=INTERPRETER_SESSION_POOL_SIZE,
+            session_idle_ttl=INTERPRETER_SESSION_IDLE_TTL,
         )
         tools.append(py_interpreter)
         
-        # 6. Extend tools with MCP tools from DDG search server
-        mcp_tools = await self._get_mcp_tools("http://localhost:8051/mcp")
+        # 6. Add ToolResultReaderTool to read large results stored out-of-band
+        if self.result_store:
+            tools.append(ToolResultReaderTool(endpoint=DIAL_ENDPOINT, max_length=TOOL_RESULT_STORE_THRESHOLD))
+        
+        # 7. Extend tools with MCP tools from DDG search server
+        mcp_tools = await self._get_mcp_tools(DDG_MCP_URL, memoize_ttl=DDG_MEMOIZE_TTL or None)
         tools.extend(mcp_tools)
         
         return tools
 
     async def chat_completion(self, request: Request, response: Response) -> None:
-        # 1. If tools are absent, create them
-        if not self.tools:
-            self.tools = await self._create_tools()
-        
-        # 2. Create choice and handle request
-        with response.create_single_choice() as choice:
-            agent = GeneralPurposeAgent(
-                endpoint=DIAL_ENDPOINT,
-                system_prompt=SYSTEM_PROMPT,
-                tools=self.tools,
-            )
-            await agent.handle_request(
-                choice=choice,
-                deployment_name=DEPLOYMENT_NAME,
-                request=request,
-                response=response,
+        # 1. Wait for admission, reject fast with 429 when the queue is full
+        admission_key = request.api_key or ""
+        try:
+            ticket = await self.admission.acquire(admission_key)
+        except AdmissionRejectedError as e:
+            raise HTTPException(
+                message=str(e),
+                status_code=429,
+                type="rate_limit_exceeded",
+                headers={"Retry-After": str(e.retry_after)},
             )
+        
+        conversation_id = request.headers.get("x-conversation-id", "")
+        try:
+            # 2. If tools are absent, create them and build registry with compiled argument validators
+            if not self.tools:
+                self.tools = await self._create_tools()
+                self.tool_registry = ToolRegistry(self.tools)
+                if TOOL_SELECTION_TOP_K > 0:
+                    self.tool_selector = ToolSelector(
+                        model=self.embedding_model,
+                        tools=self.tools,
+                        top_k=TOOL_SELECTION_TOP_K,
+                        always_include={READ_TOOL_RESULT_NAME} if self.result_store else None,
+                    )
+            
+            # 3. Start background indexing of newly attached files
+            if self.prefetcher:
+                self.prefetcher.start(latest_attachments(request.messages), request.api_key or "", conversation_id)
+            
+            # 4. Resolve deployments of LLM calls for this request
+            deployments = self.model_router.resolve(request.headers)
+            
+            # 5. Create choice and handle request
+            with response.create_single_choice() as choice:
+                agent = GeneralPurposeAgent(
+                    endpoint=DIAL_ENDPOINT,
+                    system_prompt=SYSTEM_PROMPT,
+                    tool_registry=self.tool_registry,
+                    tool_call_memo=self.tool_call_memo,
+                    speculative_tool_execution=SPECULATIVE_TOOL_EXECUTION,
+                    tool_limits=self.tool_limits,
+                    result_store=self.result_store,
+                    tool_selector=self.tool_selector,
+                    state_codec=self.state_codec,
+                    upstream_policy=self.upstream_policy,
+                    deployments=deployments,
+                )
+                await agent.handle_request(
+                    choice=choice,
+                    deployment_name=deployments[AGENT_ROUTE],
+                    request=request,
+                    response=response,
+                )
+        except asyncio.CancelledError:
+            # Client went away, nobody will use files prefetched for this turn
+            if self.prefetcher:
+                self.prefetcher.cancel(conversation_id)
+            raise
+        finally:
+            self.admission.release(admission_key, ticket)
 
 
 # 1. Create DIALApp
 app = DIALApp()
+if TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        path=TRAFFIC_CAPTURE_PATH,
+        sample_rate=TRAFFIC_CAPTURE_SAMPLE_RATE,
+    )
 
 # 2. Create GeneralPurposeAgentApplication
 agent_app = GeneralPurposeAgentApplication()
@@ -111,6 +377,17 @@ app.add_chat_completion(
     impl=agent_app,
 )
 
-# 4. Run with uvicorn
+# 4. Expose upstream call counters (retries, hedges, timeouts), latency and tokens per route, per worker process
+app.add_api_route(
+    "/metrics/upstream",
+    lambda: agent_app.upstream_policy.metrics.snapshot(),
+    methods=["GET"],
+)
+
+# 5. Run with uvicorn, in multi-worker mode preload shared resources and fork workers
 if __name__ == "__main__":
-    uvicorn.run(app, port=5030, host="0.0.0.0")
+    if WORKERS > 1:
+        agent_app.preload()
+        run_prefork(app, host="0.0.0.0", port=5030, workers=WORKERS, on_worker_start=_init_worker)
+    else:
+        uvicorn.run(app, port=5030, host="0.0.0.0")
@@ -0,0 +1,79 @@
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Any, Callable, Optional
+
+import uvicorn
+
+
+def run_prefork(
+        app: Any,
+        host: str,
+        port: int,
+        workers: int,
+        on_worker_start: Optional[Callable[[int], None]] = None,
+) -> None:
+    """
+    Runs `workers` uvicorn servers forked from the current process and sharing one listening socket.
+
+    Everything loaded before the call (e.g. embedding model weights) is shared copy-on-write between workers
+    instead of being loaded by each of them. Objects bound to an event loop or network connections
+    (MCP clients, HTTP clients) must be created lazily inside workers. Dead workers are restarted. POSIX only.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Move preloaded objects to permanent generation so GC in workers doesn't touch (and copy) their pages
+    gc.collect()
+    gc.freeze()
+
+    children: dict[int, int] = {}
+    stopping = False
+
+    def spawn(worker_id: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            if on_worker_start:
+                on_worker_start(worker_id)
+            print(f"[prefork] Worker {worker_id} started (pid {os.getpid()})")
+            uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+            os._exit(0)
+        children[pid] = worker_id
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+    print(f"[prefork] Serving on {host}:{port} with {workers} workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id = children.pop(pid, None)
+        if worker_id is not None and not stopping:
+            print(f"[prefork] Worker {worker_id} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(1)
+            spawn(worker_id)
+
+    sock.close()
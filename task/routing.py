@@ -0,0 +1,50 @@
+from typing import Mapping
+
+AGENT_ROUTE = "agent"
+RAG_ROUTE = "rag"
+WEB_SEARCH_ROUTE = "web_search"
+
+# Request header overriding configured routes, same format as configuration: "rag=gpt-4o-mini,web_search=..."
+ROUTES_HEADER = "x-model-routes"
+
+# Routes a request may override, the agent loop always runs on the configured deployment
+OVERRIDABLE_ROUTES = {RAG_ROUTE, WEB_SEARCH_ROUTE}
+
+
+class ModelRouter:
+    """
+    Maps LLM calls (routes: agent loop, RAG generation, web search) to deployments, so auxiliary tasks
+    can use cheaper and faster models than the agent itself.
+    When enabled, a request can override deployments of auxiliary routes with the `X-Model-Routes` header,
+    only to deployments from `allowed_deployments` (by default the configured ones).
+    """
+
+    def __init__(
+            self,
+            routes: dict[str, str],
+            allow_header_overrides: bool = False,
+            allowed_deployments: set[str] | None = None,
+    ):
+        self.routes = dict(routes)
+        self.allow_header_overrides = allow_header_overrides
+        self.allowed_deployments = set(allowed_deployments) if allowed_deployments else set(self.routes.values())
+
+    @staticmethod
+    def parse(value: str) -> dict[str, str]:
+        routes = {}
+        for item in value.split(','):
+            if '=' in item:
+                route, deployment = item.split('=', 1)
+                if route.strip() and deployment.strip():
+                    routes[route.strip()] = deployment.strip()
+        return routes
+
+    def resolve(self, headers: Mapping[str, str] | None = None) -> dict[str, str]:
+        """Returns deployment per route for a request."""
+        routes = dict(self.routes)
+        if self.allow_header_overrides and headers and (value := headers.get(ROUTES_HEADER)):
+            for route, deployment in self.parse(value).items():
+                # Header can't add new LLM calls, move the agent loop or pick deployments the operator didn't allow
+                if route in OVERRIDABLE_ROUTES and route in routes and deployment in self.allowed_deployments:
+                    routes[route] = deployment
+        return routes
@@ -19,21 +19,69 @@ class BaseTool(ABC):
             tool_call_id=StrictStr(tool_call_params.tool_call.id),
         )
         
-        # 2. Template method pattern with try-except
+        # 2. Reuse result of an identical earlier call in this conversation (opt-in per tool)
+        memo_key = None
+        if tool_call_params.memo is not None and self.memoize_ttl:
+            memo_key = tool_call_params.memo.make_key(
+                tool_call_params.conversation_id,
+                self.name,
+                tool_call_params.tool_call.function.arguments,
+                scope=self.memo_scope(tool_call_params),
+            )
+            memoized = tool_call_params.memo.get(memo_key) if memo_key else None
+            if memoized is not None:
+                tool_call_params.stage.append_name(" (memoized)")
+                tool_call_params.stage.append_content("*Reused result of an identical earlier call*\n\r")
+                if memoized.content:
+                    tool_call_params.stage.append_content(f"```text\n\r{memoized.content}\n\r```\n\r")
+                return self._as_tool_message(memoized, tool_call_params)
+        
+        # 3. Template method pattern with try-except
         try:
             result = await self._execute(tool_call_params)
             if isinstance(result, Message):
-                message = result
-                # Ensure required fields are set
-                message.role = Role.TOOL
-                message.name = StrictStr(tool_call_params.tool_call.function.name)
-                message.tool_call_id = StrictStr(tool_call_params.tool_call.id)
+                message = self._as_tool_message(result, tool_call_params)
             else:
                 message.content = StrictStr(result)
         except Exception as e:
             message.content = StrictStr(f"Error: {str(e)}")
+            return message
+        
+        # 4. Store large results out-of-band, only preview and reference go to the model
+        if tool_call_params.result_store is not None and self.store_large_results:
+            await self._store_large_result(message, tool_call_params)
+        
+        # 5. Memoize successful results only
+        if memo_key and not (message.content or "").startswith("Error"):
+            tool_call_params.memo.set(memo_key, message, ttl_seconds=self.memoize_ttl)
         
-        # 3. Return created message
+        # 6. Return created message
+        return message
+
+    @staticmethod
+    async def _store_large_result(message: Message, tool_call_params: ToolCallParams) -> None:
+        result_store = tool_call_params.result_store
+        if not result_store.should_store(message.content):
+            return
+        try:
+            url = await result_store.store(
+                content=message.content,
+                api_key=tool_call_params.api_key,
+                conversation_id=tool_call_params.conversation_id,
+                tool_call_id=tool_call_params.tool_call.id,
+            )
+        except Exception as e:
+            # Inline result is still better than no result
+            print(f"⚠️ Unable to store large tool result, returning it inline. {e}")
+            return
+        message.content = StrictStr(result_store.preview(message.content, url))
+
+    @staticmethod
+    def _as_tool_message(message: Message, tool_call_params: ToolCallParams) -> Message:
+        # Ensure required fields are set
+        message.role = Role.TOOL
+        message.name = StrictStr(tool_call_params.tool_call.function.name)
+        message.tool_call_id = StrictStr(tool_call_params.tool_call.id)
         return message
 
     @abstractmethod
@@ -44,6 +92,23 @@ class BaseTool(ABC):
     def show_in_stage(self) -> bool:
         return True
 
+    @property
+    def store_large_results(self) -> bool:
+        """Whether results above the result store threshold are stored as files instead of inlined."""
+        return True
+
+    @property
+    def memoize_ttl(self) -> float | None:
+        """
+        TTL in seconds for reusing results of identical calls within a conversation.
+        None disables memoization, override only for deterministic tools.
+        """
+        return None
+
+    def memo_scope(self, tool_call_params: ToolCallParams) -> str:
+        """Part of the memo key besides arguments that changes the result, e.g. deployment the call is routed to."""
+        return ""
+
     @property
     @abstractmethod
     def name(self) -> str:
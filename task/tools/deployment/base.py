@@ -1,4 +1,3 @@
-import json
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -8,12 +7,16 @@ from pydantic import StrictStr
 
 from task.tools.base import BaseTool
 from task.tools.models import ToolCallParams
+from task.upstream import UpstreamPolicy
+from task.utils.stream_accumulator import StreamAccumulator
+from task.utils import serialization
 
 
 class DeploymentTool(BaseTool, ABC):
 
-    def __init__(self, endpoint: str):
+    def __init__(self, endpoint: str, upstream_policy: UpstreamPolicy | None = None):
         self.endpoint = endpoint
+        self.upstream_policy = upstream_policy or UpstreamPolicy()
 
     @property
     @abstractmethod
@@ -24,6 +27,21 @@ class DeploymentTool(BaseTool, ABC):
     def tool_parameters(self) -> dict[str, Any]:
         return {}
 
+    @property
+    def hedge_requests(self) -> bool:
+        """Whether a late deployment call may be duplicated by a hedged one, disable for costly generations."""
+        return True
+
+    @property
+    def retry_requests(self) -> bool:
+        """Whether a failed deployment call may be repeated, disable for generations billed even when they fail."""
+        return True
+
+    @property
+    def first_token_timeout(self) -> float | None:
+        """Overrides upstream policy first token timeout, 0 disables it."""
+        return None
+
     @property
     def system_prompt(self) -> str | None:
         """Optional system prompt for the deployment. Override in subclasses if needed."""
@@ -31,7 +49,7 @@ class DeploymentTool(BaseTool, ABC):
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         # 1. Load arguments with json
-        arguments = json.loads(tool_call_params.tool_call.function.arguments)
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
         
         # 2. Get prompt from arguments
         prompt = arguments.get("prompt", "")
@@ -44,6 +62,7 @@ class DeploymentTool(BaseTool, ABC):
         client = AsyncDial(
             base_url=self.endpoint,
             api_key=tool_call_params.api_key,
+            **self.upstream_policy.client_options(),
         )
         
         # 5. Build messages list
@@ -55,47 +74,54 @@ class DeploymentTool(BaseTool, ABC):
         # Call chat completions
         extra_body = {"custom_fields": arguments} if arguments else None
         
-        chunks = await client.chat.completions.create(
-            messages=messages,
-            stream=True,
-            deployment_name=self.deployment_name,
-            extra_body=extra_body,
-            **self.tool_parameters
+        chunks = await self.upstream_policy.stream(
+            lambda: client.chat.completions.create(
+                messages=messages,
+                stream=True,
+                deployment_name=self.deployment_name,
+                extra_body=extra_body,
+                **self.tool_parameters
+            ),
+            route=self.deployment_name,
+            first_token_timeout=self.first_token_timeout,
+            hedge=self.hedge_requests,
+            retry=self.retry_requests,
         )
         
         # 6. Collect content and attachments
-        content = ""
         attachments = []
         stage = tool_call_params.stage
-        
-        async for chunk in chunks:
-            if chunk.choices:
-                choice = chunk.choices[0]
-                delta = choice.delta
+        with StreamAccumulator(stage.append_content) as accumulator:
+            async for chunk in chunks:
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    delta = choice.delta
                 
-                if delta:
-                    # Collect content
-                    if delta.content:
-                        content += delta.content
-                        stage.append_content(delta.content)
+                    if delta:
+                        # Collect content
+                        if delta.content:
+                            accumulator.append(delta.content)
                     
-                    # Collect attachments from custom_content
-                    if hasattr(delta, 'custom_content') and delta.custom_content:
-                        if hasattr(delta.custom_content, 'attachments') and delta.custom_content.attachments:
-                            for attachment in delta.custom_content.attachments:
-                                # Only add attachments that have url or data
-                                att_url = getattr(attachment, 'url', None)
-                                att_data = getattr(attachment, 'data', None)
-                                if att_url or att_data:
-                                    attachments.append(attachment)
-                                    # Add attachment to stage only if it has url
-                                    if att_url:
-                                        stage.add_attachment(
-                                            type=getattr(attachment, 'type', None),
-                                            title=getattr(attachment, 'title', None),
-                                            url=att_url,
-                                            reference_url=getattr(attachment, 'reference_url', None),
-                                        )
+                        # Collect attachments from custom_content
+                        if hasattr(delta, 'custom_content') and delta.custom_content:
+                            if hasattr(delta.custom_content, 'attachments') and delta.custom_content.attachments:
+                                for attachment in delta.custom_content.attachments:
+                                    # Only add attachments that have url or data
+                                    att_url = getattr(attachment, 'url', None)
+                                    att_data = getattr(attachment, 'data', None)
+                                    if att_url or att_data:
+                                        attachments.append(attachment)
+                                        # Add attachment to stage only if it has url
+                                        if att_url:
+                                            stage.add_attachment(
+                                                type=getattr(attachment, 'type', None),
+                                                title=getattr(attachment, 'title', None),
+                                                url=att_url,
+                                                reference_url=getattr(attachment, 'reference_url', None),
+                                            )
+                accumulator.tick()
+        
+        content = accumulator.content
         
         # 7. Return Message with tool role, content, custom_content and tool_call_id
         custom_content = None
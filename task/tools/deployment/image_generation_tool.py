@@ -1,3 +1,4 @@
+import hashlib
 from typing import Any
 
 from aidial_sdk.chat_completion import Message
@@ -5,15 +6,45 @@ from pydantic import StrictStr
 
 from task.tools.deployment.base import DeploymentTool
 from task.tools.models import ToolCallParams
+from task.upstream import UpstreamPolicy
+from task.utils.ttl_cache import TTLCache
+from task.utils import serialization
 
 
 class ImageGenerationTool(DeploymentTool):
 
+    def __init__(
+            self,
+            endpoint: str,
+            cache: TTLCache | None = None,
+            share_cache_across_keys: bool = False,
+            upstream_policy: UpstreamPolicy | None = None,
+    ):
+        """
+        :param cache: optional cache of generated images keyed by normalized prompt and size/quality/style.
+        :param share_cache_across_keys: reuse images generated in other conversations. Enable only if generated
+            files are readable by all users, by default attachment URLs are reused within the same conversation
+            (within the same API key for requests without conversation id, DIAL issues a new key per request).
+        """
+        super().__init__(endpoint, upstream_policy)
+        self.cache = cache
+        self.share_cache_across_keys = share_cache_across_keys
+
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
-        # 1. Call parent function _execute and get result
-        result = await super()._execute(tool_call_params)
+        # 1. Reuse previously generated image for the same prompt and parameters, otherwise call parent _execute
+        cache_key = self._cache_key(tool_call_params) if self.cache is not None else None
+        cached_result = self.cache.get(cache_key) if cache_key else None
+        if cached_result is not None:
+            result = cached_result.copy(deep=True)
+            tool_call_params.stage.append_name(" (cached)")
+            tool_call_params.stage.append_content("*Reused previously generated image*\n\r")
+            for attachment in result.custom_content.attachments:
+                tool_call_params.stage.add_attachment(attachment)
+        else:
+            result = await super()._execute(tool_call_params)
         
         # 2. If attachments are present, filter only images and add to choice
+        image_attachments = []
         if result.custom_content and result.custom_content.attachments:
             image_attachments = [
                 att for att in result.custom_content.attachments
@@ -29,12 +60,54 @@ class ImageGenerationTool(DeploymentTool):
         if not result.content:
             result.content = StrictStr("The image has been successfully generated according to request and shown to user!")
         
+        # 5. Cache only results with uploaded images
+        if cache_key and cached_result is None and any(att.url for att in image_attachments):
+            self.cache.set(cache_key, result.copy(deep=True))
+        
         return result
 
+    def _cache_key(self, tool_call_params: ToolCallParams) -> tuple[str, ...] | None:
+        try:
+            arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
+        except ValueError:
+            return None
+        prompt = " ".join(str(arguments.get("prompt", "")).lower().split())
+        if not prompt:
+            return None
+        if self.share_cache_across_keys:
+            key_scope = ""
+        elif tool_call_params.conversation_id:
+            # Conversation belongs to one user, regenerate and repeated prompts in it reuse images
+            key_scope = f"conversation:{tool_call_params.conversation_id}"
+        else:
+            key_scope = hashlib.sha256(tool_call_params.api_key.encode('utf-8')).hexdigest()
+        return (
+            key_scope,
+            prompt,
+            arguments.get("size", "1024x1024"),
+            arguments.get("quality", "standard"),
+            arguments.get("style", "vivid"),
+        )
+
     @property
     def deployment_name(self) -> str:
         return "dall-e-3"
 
+    @property
+    def hedge_requests(self) -> bool:
+        # Each attempt generates and uploads an image
+        return False
+
+    @property
+    def retry_requests(self) -> bool:
+        # A timed out attempt may still produce a billed image
+        return False
+
+    @property
+    def first_token_timeout(self) -> float | None:
+        # Content arrives only when the image is ready, total time is bounded by tool timeout
+        return 0
+
     @property
     def name(self) -> str:
         return "image_generation"
@@ -1,4 +1,3 @@
-import json
 from typing import Any
 
 from aidial_client import AsyncDial
@@ -6,17 +5,34 @@ from aidial_sdk.chat_completion import Message, Role
 from pydantic import StrictStr
 
 from task.tools.base import BaseTool
+from task.routing import WEB_SEARCH_ROUTE
 from task.tools.models import ToolCallParams
+from task.upstream import UpstreamPolicy
+from task.utils.stream_accumulator import StreamAccumulator
+from task.utils.ttl_cache import TTLCache
+from task.utils import serialization
 
 
 class WebSearchTool(BaseTool):
     """
     Tool for WEB searching using Gemini with Google Search grounding.
+    Results can be cached by normalized query and shared across conversations.
     """
 
-    def __init__(self, endpoint: str):
+    def __init__(
+            self,
+            endpoint: str,
+            cache: TTLCache | None = None,
+            upstream_policy: UpstreamPolicy | None = None,
+            deployment_name: str = "gemini-2.5-pro",
+    ):
+        """
+        :param deployment_name: default deployment with Google Search grounding, can be routed per request
+        """
         self.endpoint = endpoint
-        self.deployment_name = "gemini-2.5-pro"
+        self.deployment_name = deployment_name
+        self.cache = cache
+        self.upstream_policy = upstream_policy or UpstreamPolicy()
 
     @property
     def name(self) -> str:
@@ -46,50 +62,74 @@ class WebSearchTool(BaseTool):
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         # Load arguments
-        arguments = json.loads(tool_call_params.tool_call.function.arguments)
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
         request = arguments.get("request", "")
         
         stage = tool_call_params.stage
         
+        # Serve repeated searches from cache, results of different deployments are not mixed
+        deployment_name = tool_call_params.deployment_for(WEB_SEARCH_ROUTE, self.deployment_name)
+        cache_key = (deployment_name, self._normalize_query(request))
+        if self.cache is not None:
+            cached_content = self.cache.get(cache_key)
+            if cached_content is not None:
+                stage.append_name(" (cached)")
+                stage.append_content("*Served from search cache*\n\r")
+                stage.append_content(cached_content)
+                return cached_content
+        
         # Create AsyncDial client
         client = AsyncDial(
             base_url=self.endpoint,
             api_key=tool_call_params.api_key,
+            **self.upstream_policy.client_options(),
         )
         
         # Call chat completions with Google Search grounding tool
-        chunks = await client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": request}
-            ],
-            stream=True,
-            deployment_name=self.deployment_name,
-            temperature=0,
-            extra_body={
-                "tools": [
-                    {
-                        "type": "static_function",
-                        "static_function": {
-                            "name": "google_search",
-                            "description": "Grounding with Google Search",
-                            "configuration": {}
+        chunks = await self.upstream_policy.stream(
+            lambda: client.chat.completions.create(
+                messages=[
+                    {"role": "user", "content": request}
+                ],
+                stream=True,
+                deployment_name=deployment_name,
+                temperature=0,
+                extra_body={
+                    "tools": [
+                        {
+                            "type": "static_function",
+                            "static_function": {
+                                "name": "google_search",
+                                "description": "Grounding with Google Search",
+                                "configuration": {}
+                            }
                         }
-                    }
-                ]
-            }
+                    ]
+                }
+            ),
+            route=WEB_SEARCH_ROUTE,
+            deployment=deployment_name,
         )
         
         # Collect and stream content
-        content = ""
-        async for chunk in chunks:
-            if chunk.choices:
-                delta = chunk.choices[0].delta
-                if delta and delta.content:
-                    content += delta.content
-                    stage.append_content(delta.content)
+        with StreamAccumulator(stage.append_content) as accumulator:
+            async for chunk in chunks:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta
+                    if delta and delta.content:
+                        accumulator.append(delta.content)
+        content = accumulator.content
         
         if not content:
-            content = "No results found for the search query."
+            return "No results found for the search query."
+        
+        if self.cache is not None:
+            self.cache.set(cache_key, content)
         
         return content
 
+    @staticmethod
+    def _normalize_query(request: str) -> str:
+        # Case and whitespace differences should hit the same cache entry
+        return " ".join(request.lower().split())
+
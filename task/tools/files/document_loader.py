@@ -0,0 +1,40 @@
+import asyncio
+import hashlib
+
+from task.utils.dial_file_conent_extractor import DialFileContentExtractor
+from task.utils.single_flight import SingleFlight
+from task.utils.ttl_cache import TTLCache
+
+
+class DocumentLoader:
+    """
+    Downloads and extracts text of DIAL files off the event loop.
+    Concurrent loads of the same file share one download, results are kept in optional TTL cache
+    so file tools and background prefetch of attachments reuse them.
+    """
+
+    def __init__(self, endpoint: str, cache: TTLCache | None = None):
+        self.endpoint = endpoint
+        self.cache = cache
+        self._loads = SingleFlight()
+
+    async def load_pages(self, file_url: str, api_key: str) -> list[str]:
+        """Returns text per page, see `DialFileContentExtractor.extract_pages`."""
+        # Access to files depends on the key, so cached content is scoped by it
+        key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16], file_url)
+        if self.cache is not None:
+            pages = self.cache.get(key)
+            if pages is not None:
+                return pages
+        return await self._loads.run(key, lambda: self._load(key, file_url, api_key))
+
+    async def load_text(self, file_url: str, api_key: str) -> str:
+        return '\n'.join(await self.load_pages(file_url, api_key))
+
+    async def _load(self, key: tuple[str, str], file_url: str, api_key: str) -> list[str]:
+        extractor = DialFileContentExtractor(endpoint=self.endpoint, api_key=api_key)
+        pages = await asyncio.to_thread(extractor.extract_pages, file_url)
+        # Extraction errors come back as no pages, don't keep them
+        if self.cache is not None and any(pages):
+            self.cache.set(key, pages)
+        return pages
@@ -1,11 +1,11 @@
-import json
 from typing import Any
 
 from aidial_sdk.chat_completion import Message
 
 from task.tools.base import BaseTool
+from task.tools.files.document_loader import DocumentLoader
 from task.tools.models import ToolCallParams
-from task.utils.dial_file_conent_extractor import DialFileContentExtractor
+from task.utils import serialization
 
 
 class FileContentExtractionTool(BaseTool):
@@ -15,14 +15,21 @@ class FileContentExtractionTool(BaseTool):
     USAGE: Start with page=1 (by default)
     """
 
-    def __init__(self, endpoint: str):
+    def __init__(self, endpoint: str, loader: DocumentLoader | None = None):
         self.endpoint = endpoint
+        # Shared with RagTool and attachment prefetch, so a file is downloaded and extracted once
+        self.loader = loader or DocumentLoader(endpoint)
 
     @property
     def show_in_stage(self) -> bool:
         # Set as False since we will have custom variant of representation in Stage
         return False
 
+    @property
+    def memoize_ttl(self) -> float | None:
+        # Same file and page always produce the same content
+        return 600
+
     @property
     def name(self) -> str:
         return "file_content_extraction"
@@ -56,7 +63,7 @@ class FileContentExtractionTool(BaseTool):
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         # 1. Load arguments
-        arguments = json.loads(tool_call_params.tool_call.function.arguments)
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
         
         # 2. Get file_url from arguments
         file_url = arguments.get("file_url")
@@ -80,12 +87,8 @@ class FileContentExtractionTool(BaseTool):
         # 8. Append response header to stage
         stage.append_content("## Response: \n")
         
-        # 9. Create DialFileContentExtractor and extract text
-        extractor = DialFileContentExtractor(
-            endpoint=self.endpoint,
-            api_key=tool_call_params.api_key
-        )
-        content = extractor.extract_text(file_url)
+        # 9. Extract text with DocumentLoader (reuses prefetched content)
+        content = await self.loader.load_text(file_url, tool_call_params.api_key)
         
         # 10. If no content present, set error message
         if not content:
@@ -0,0 +1,95 @@
+import hashlib
+from typing import Any
+
+from aidial_client import AsyncDial
+from aidial_sdk.chat_completion import Message
+
+from task.tools.base import BaseTool
+from task.tools.models import ToolCallParams
+from task.tools.result_store import READ_TOOL_RESULT_NAME
+from task.utils.ttl_cache import TTLCache
+from task.utils import serialization
+
+
+class ToolResultReaderTool(BaseTool):
+    """
+    Reads ranges of large tool results stored out-of-band by ToolResultStore.
+    """
+
+    def __init__(self, endpoint: str, max_length: int = 8_000):
+        self.endpoint = endpoint
+        # Keep it not bigger than result store threshold, otherwise read range would be stored again
+        self.max_length = max_length
+        # Successive ranges of the same result are read from memory
+        self._contents = TTLCache(ttl_seconds=600, max_size=32)
+
+    @property
+    def store_large_results(self) -> bool:
+        return False
+
+    @property
+    def memoize_ttl(self) -> float | None:
+        return 600
+
+    @property
+    def name(self) -> str:
+        return READ_TOOL_RESULT_NAME
+
+    @property
+    def description(self) -> str:
+        return (
+            "Reads a part of a large tool result that was truncated and stored as a file. "
+            "Use `result_url` from the truncated result note, `offset` is the character position to start from. "
+            f"Returns at most {self.max_length} characters per call."
+        )
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "result_url": {
+                    "type": "string",
+                    "description": "URL of the stored tool result."
+                },
+                "offset": {
+                    "type": "integer",
+                    "default": 0,
+                    "description": "Character position to start reading from."
+                },
+                "length": {
+                    "type": "integer",
+                    "default": self.max_length,
+                    "description": f"Number of characters to read, max {self.max_length}."
+                }
+            },
+            "required": ["result_url"]
+        }
+
+    async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
+        # 1. Load arguments
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
+        result_url = arguments.get("result_url")
+        offset = max(0, arguments.get("offset", 0))
+        length = min(max(1, arguments.get("length", self.max_length)), self.max_length)
+
+        # 2. Get stored content, download it only once per conversation
+        # Access to files depends on the key, so cached content is scoped by it
+        key_scope = hashlib.sha256(tool_call_params.api_key.encode('utf-8')).hexdigest()[:16]
+        cache_key = (key_scope, tool_call_params.conversation_id, result_url)
+        content = self._contents.get(cache_key)
+        if content is None:
+            client = AsyncDial(base_url=self.endpoint, api_key=tool_call_params.api_key)
+            downloaded_file = await client.files.download(result_url)
+            content = (await downloaded_file.aget_content()).decode('utf-8', errors='ignore')
+            self._contents.set(cache_key, content)
+
+        # 3. Slice requested range
+        if offset >= len(content):
+            return f"Error: Offset {offset} is out of range. Total length: {len(content)} characters."
+        end = min(offset + length, len(content))
+        result = f"{content[offset:end]}\n\n**Characters {offset}-{end} of {len(content)}**"
+
+        # 4. Append result to stage
+        tool_call_params.stage.append_content(f"```text\n\r{result}\n\r```\n\r")
+        return result
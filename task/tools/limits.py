@@ -0,0 +1,66 @@
+import asyncio
+from typing import Optional
+
+from aidial_client.types.chat.legacy.chat_completion import Role
+from aidial_sdk.chat_completion import Message
+from pydantic import StrictStr
+
+from task.tools.base import BaseTool
+from task.tools.models import ToolCallParams
+from task.utils import serialization
+
+
+class ToolExecutionLimits:
+    """
+    Per-tool timeouts and global (cross-request) concurrency limits for tool execution.
+    A call that doesn't finish in time (including waiting for a free slot) returns a structured error
+    to the model instead of blocking the turn.
+    """
+
+    def __init__(
+            self,
+            default_timeout: Optional[float] = None,
+            timeouts: Optional[dict[str, float]] = None,
+            max_concurrency: Optional[dict[str, int]] = None,
+    ):
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {
+            tool_name: asyncio.Semaphore(limit)
+            for tool_name, limit in (max_concurrency or {}).items()
+            if limit > 0
+        }
+
+    def timeout_for(self, tool_name: str) -> Optional[float]:
+        timeout = self.timeouts.get(tool_name, self.default_timeout)
+        return timeout if timeout and timeout > 0 else None
+
+    async def execute(self, tool: BaseTool, tool_call_params: ToolCallParams) -> Message:
+        timeout = self.timeout_for(tool.name)
+        try:
+            return await asyncio.wait_for(self._execute_in_slot(tool, tool_call_params), timeout=timeout)
+        except asyncio.TimeoutError:
+            tool_call_params.stage.append_content(f"\n\r**Error**: Tool timed out after {timeout:g}s\n\r")
+            return Message(
+                role=Role.TOOL,
+                name=StrictStr(tool.name),
+                tool_call_id=StrictStr(tool_call_params.tool_call.id),
+                content=StrictStr(serialization.dumps({
+                    "error": {
+                        "type": "timeout",
+                        "tool": tool.name,
+                        "timeout_seconds": timeout,
+                        "message": (
+                            f"Tool '{tool.name}' did not finish within {timeout:g} seconds and was cancelled. "
+                            "Retry with a simpler request or continue without this result."
+                        ),
+                    }
+                })),
+            )
+
+    async def _execute_in_slot(self, tool: BaseTool, tool_call_params: ToolCallParams) -> Message:
+        semaphore = self._semaphores.get(tool.name)
+        if semaphore is None:
+            return await tool.execute(tool_call_params)
+        async with semaphore:
+            return await tool.execute(tool_call_params)
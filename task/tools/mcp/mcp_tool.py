@@ -1,4 +1,3 @@
-import json
 from typing import Any
 
 from aidial_sdk.chat_completion import Message
@@ -7,19 +6,22 @@ from task.tools.base import BaseTool
 from task.tools.mcp.mcp_client import MCPClient
 from task.tools.mcp.mcp_tool_model import MCPToolModel
 from task.tools.models import ToolCallParams
+from task.utils import serialization
 
 
 class MCPTool(BaseTool):
 
-    def __init__(self, client: MCPClient, mcp_tool_model: MCPToolModel):
+    def __init__(self, client: MCPClient, mcp_tool_model: MCPToolModel, memoize_ttl: float | None = None):
         # 1. Set client
         self.client = client
         # 2. Set mcp_tool_model
         self.mcp_tool_model = mcp_tool_model
+        # 3. Set memoize_ttl, MCP tools are not memoized unless configured
+        self._memoize_ttl = memoize_ttl
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         # 1. Load arguments with json
-        arguments = json.loads(tool_call_params.tool_call.function.arguments)
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
         
         # 2. Get content with mcp client tool call
         content = await self.client.call_tool(self.name, arguments)
@@ -30,6 +32,10 @@ class MCPTool(BaseTool):
         # 4. Return content
         return str(content)
 
+    @property
+    def memoize_ttl(self) -> float | None:
+        return self._memoize_ttl
+
     @property
     def name(self) -> str:
         # Provide name from mcp_tool_model
@@ -0,0 +1,41 @@
+from aidial_sdk.chat_completion import Message
+
+from task.utils import serialization
+from task.utils.ttl_cache import TTLCache
+
+# (conversation_id, tool_name, scope, canonical_arguments)
+MemoKey = tuple[str, str, str, str]
+
+
+class ToolCallMemo:
+    """
+    Memoizes tool results within a conversation.
+    Entries are keyed by conversation id, tool name, tool scope (e.g. deployment serving the call) and canonicalized arguments.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self._cache = TTLCache(ttl_seconds=0, max_size=max_size)
+
+    @staticmethod
+    def make_key(conversation_id: str, tool_name: str, arguments: str, scope: str = "") -> MemoKey | None:
+        """
+        Build memo key, returns None when the call can't be memoized
+        (no conversation to scope it to or arguments are not valid JSON).
+        """
+        if not conversation_id:
+            return None
+        try:
+            canonical_arguments = serialization.dumps(serialization.loads(arguments or "{}"), sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        return conversation_id, tool_name, scope, canonical_arguments
+
+    def get(self, key: MemoKey) -> Message | None:
+        message = self._cache.get(key)
+        return message.copy(deep=True) if message is not None else None
+
+    def set(self, key: MemoKey, message: Message, ttl_seconds: float) -> None:
+        self._cache.set(key, message.copy(deep=True), ttl_seconds=ttl_seconds)
+
+    def clear(self) -> None:
+        self._cache.clear()
@@ -1,7 +1,12 @@
 from dataclasses import dataclass
+from typing import Optional
+
 from aidial_sdk.chat_completion import Stage, Choice
 from aidial_client.types.chat.legacy.chat_completion import ToolCall
 
+from task.tools.memo import ToolCallMemo
+from task.tools.result_store import ToolResultStore
+
 
 @dataclass
 class ToolCallParams:
@@ -10,3 +15,10 @@ class ToolCallParams:
     choice: Choice
     api_key: str
     conversation_id: str
+    memo: Optional[ToolCallMemo] = None
+    result_store: Optional[ToolResultStore] = None
+    # Deployment per LLM call route resolved for the request, see ModelRouter
+    deployments: Optional[dict[str, str]] = None
+
+    def deployment_for(self, route: str, default: str) -> str:
+        return (self.deployments or {}).get(route, default)
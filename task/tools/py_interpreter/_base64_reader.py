@@ -0,0 +1,70 @@
+import base64
+import binascii
+import io
+import os
+import re
+
+_WHITESPACE = re.compile(rb'\s+')
+
+
+class _Base64Reader(io.RawIOBase):
+    """
+    Read-only binary stream that decodes base64 text lazily, chunk by chunk.
+    Lets upload body be built straight from the MCP resource without materializing decoded bytes.
+    Supports seek/tell so HTTP client can get content length.
+    Line breaks and missing padding are accepted like `base64.b64decode` does for MIME content.
+    """
+
+    def __init__(self, encoded: str | bytes):
+        super().__init__()
+        if isinstance(encoded, str):
+            encoded = encoded.encode('ascii')
+        # MIME-style content is wrapped into lines, copy it without line breaks only when it has them
+        if _WHITESPACE.search(encoded):
+            encoded = _WHITESPACE.sub(b'', encoded)
+        if len(encoded) % 4 == 1:
+            raise ValueError("Invalid base64 content: length can't be 1 more than a multiple of 4")
+        if len(encoded) % 4:
+            # Restore omitted padding
+            encoded += b'=' * (-len(encoded) % 4)
+        self._encoded = memoryview(encoded)
+        padding = len(encoded) - len(encoded.rstrip(b'='))
+        self._length = len(encoded) // 4 * 3 - padding
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = self._length + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._position = max(0, min(position, self._length))
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._length - self._position)
+        if size <= 0:
+            return 0
+        # Decode whole 4-char groups covering requested range, then cut the edges
+        start_group = self._position // 3
+        end_group = (self._position + size + 2) // 3
+        try:
+            decoded = base64.b64decode(self._encoded[start_group * 4:end_group * 4])
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 content: {e}") from e
+        skip = self._position - start_group * 3
+        buffer[:size] = decoded[skip:skip + size]
+        self._position += size
+        return size
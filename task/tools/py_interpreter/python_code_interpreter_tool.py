@@ -1,16 +1,28 @@
-import base64
-import json
+import asyncio
+import re
+from pathlib import PurePosixPath
 from typing import Any, Optional
 
-from aidial_client import Dial
-from aidial_sdk.chat_completion import Message, Attachment
-from pydantic import StrictStr, AnyUrl
+from aidial_client import AsyncDial
+from aidial_sdk.chat_completion import Message
+from pydantic import AnyUrl
 
 from task.tools.base import BaseTool
-from task.tools.py_interpreter._response import _ExecutionResult
+from task.tools.py_interpreter._base64_reader import _Base64Reader
+from task.tools.py_interpreter._response import _ExecutionResult, _FileReference
+from task.tools.py_interpreter.session_pool import InterpreterSessionPool
 from task.tools.mcp.mcp_client import MCPClient
 from task.tools.mcp.mcp_tool_model import MCPToolModel
 from task.tools.models import ToolCallParams
+from task.utils import serialization
+
+_TEXT_MIME_TYPES = ['text/', 'application/json', 'application/xml']
+_MAX_PARALLEL_FILE_TRANSFERS = 4
+# Server error for a session id it doesn't know (restart, eviction), e.g. "Session abc not found"
+_UNKNOWN_SESSION_ERROR = re.compile(
+    r"^\s*(session\b.*\b(not found|does not exist|expired)|(unknown|invalid|expired) session\b)",
+    re.IGNORECASE,
+)
 
 
 class PythonCodeInterpreterTool(BaseTool):
@@ -26,10 +38,12 @@ class PythonCodeInterpreterTool(BaseTool):
             mcp_tool_models: list[MCPToolModel],
             tool_name: str,
             dial_endpoint: str,
+            session_pool: Optional[InterpreterSessionPool] = None,
     ):
         """
         :param tool_name: it must be actual name of tool that executes code. It is 'execute_code'.
             https://github.com/khshanovskyi/mcp-python-code-interpreter/blob/main/interpreter/server.py#L303
+        :param session_pool: optional pool that binds sessions to conversations and keeps warm kernels.
         """
         # 1. Set dial_endpoint
         self.dial_endpoint = dial_endpoint
@@ -47,6 +61,9 @@ class PythonCodeInterpreterTool(BaseTool):
         # 4. If _code_execute_tool is null then raise error
         if self._code_execute_tool is None:
             raise ValueError(f"Tool '{tool_name}' not found in MCP tools. Cannot set up PythonCodeInterpreterTool.")
+        
+        # 5. Set session_pool
+        self.session_pool = session_pool
 
     @classmethod
     async def create(
@@ -54,6 +71,8 @@ class PythonCodeInterpreterTool(BaseTool):
             mcp_url: str,
             tool_name: str,
             dial_endpoint: str,
+            session_pool_size: int = 0,
+            session_idle_ttl: float = 1800,
     ) -> 'PythonCodeInterpreterTool':
         """Async factory method to create PythonCodeInterpreterTool"""
         # 1. Create MCPClient
@@ -62,12 +81,24 @@ class PythonCodeInterpreterTool(BaseTool):
         # 2. Get tools
         mcp_tool_models = await mcp_client.get_tools()
         
-        # 3. Create PythonCodeInterpreterTool instance and return it
+        # 3. Create session pool and start warming kernels in background
+        session_pool = None
+        if session_pool_size > 0:
+            session_pool = InterpreterSessionPool(
+                mcp_client=mcp_client,
+                tool_name=tool_name,
+                pool_size=session_pool_size,
+                idle_ttl=session_idle_ttl,
+            )
+            session_pool.refill()
+        
+        # 4. Create PythonCodeInterpreterTool instance and return it
         return cls(
             mcp_client=mcp_client,
             mcp_tool_models=mcp_tool_models,
             tool_name=tool_name,
             dial_endpoint=dial_endpoint,
+            session_pool=session_pool,
         )
 
     @property
@@ -90,15 +121,64 @@ class PythonCodeInterpreterTool(BaseTool):
         # Provide _code_execute_tool parameters
         return self._code_execute_tool.parameters
 
+    async def _transfer_file(
+            self,
+            dial_client: AsyncDial,
+            files_home: PurePosixPath,
+            file_ref: _FileReference,
+            semaphore: asyncio.Semaphore,
+    ) -> str:
+        """Fetches generated file from MCP server and uploads it to DIAL storage, returns upload URL."""
+        async with semaphore:
+            # Get resource with mcp client by URL from file
+            resource_content = await self.mcp_client.get_resource(AnyUrl(file_ref.uri))
+            
+            # Text content is uploaded as is, binary content is decoded from base64 while upload body is read
+            is_text = any(file_ref.mime_type.startswith(t) for t in _TEXT_MIME_TYPES)
+            if is_text:
+                file_content = resource_content.encode('utf-8') if isinstance(resource_content, str) else resource_content
+            else:
+                file_content = _Base64Reader(resource_content)
+            
+            # Upload file with DIAL client
+            upload_url = f"files/{(files_home / file_ref.name).as_posix()}"
+            await dial_client.files.upload(upload_url, (file_ref.name, file_content, file_ref.mime_type))
+            return upload_url
+
+    @staticmethod
+    def _is_unknown_session_error(execution_result: _ExecutionResult) -> bool:
+        """
+        Whether the call failed because the server doesn't know the session, i.e. the code never ran.
+        Errors raised by user code come with traceback or output and are never retried, re-running them
+        would repeat their side effects.
+        """
+        return (
+                not execution_result.success
+                and not execution_result.traceback
+                and not execution_result.output
+                and bool(_UNKNOWN_SESSION_ERROR.match(execution_result.error or ""))
+        )
+
+    async def _execute_code(self, arguments: dict[str, Any]) -> _ExecutionResult:
+        result = await self.mcp_client.call_tool(self.name, arguments)
+        return _ExecutionResult.model_validate_json(result)
+
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         # 1. Load arguments with json
-        arguments = json.loads(tool_call_params.tool_call.function.arguments)
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
         
         # 2. Get code from arguments
         code = arguments.get("code", "")
         
-        # 3. Get session_id from arguments (optional)
+        # 3. Get session_id from arguments (optional), otherwise use the conversation session
         session_id = arguments.get("session_id")
+        conversation_id = tool_call_params.conversation_id
+        session_from_pool = False
+        if (not session_id or session_id == 0) and self.session_pool and conversation_id:
+            session_id = self.session_pool.acquire(conversation_id)
+            if session_id:
+                arguments["session_id"] = session_id
+                session_from_pool = True
         
         # 4. Get stage from tool_call_params
         stage = tool_call_params.stage
@@ -116,77 +196,52 @@ class PythonCodeInterpreterTool(BaseTool):
             stage.append_content("New session will be created\n\r")
         
         # 8. Make tool call
-        result = await self.mcp_client.call_tool(self.name, arguments)
+        execution_result = await self._execute_code(arguments)
         
-        # 9. Load retrieved response as json
-        result_json = json.loads(result)
+        # 9. Session from pool may be gone on server side (restart, server eviction), retry in a new one
+        if session_from_pool and self._is_unknown_session_error(execution_result):
+            self.session_pool.release(conversation_id)
+            arguments.pop("session_id", None)
+            stage.append_content("Session expired, new session will be created\n\r")
+            execution_result = await self._execute_code(arguments)
         
-        # 10. Validate result with _ExecutionResult
-        execution_result = _ExecutionResult.model_validate(result_json)
+        # 10. Bind session to conversation so follow-up cells reuse its state
+        if self.session_pool and conversation_id and execution_result.session_info:
+            self.session_pool.register(conversation_id, execution_result.session_info.session_id)
         
-        # 11. If execution_result contains files, process them
+        # 11. If execution_result contains files, transfer them to DIAL storage concurrently
         if execution_result.files:
-            # Create Dial client
-            dial_client = Dial(
+            # Create AsyncDial client
+            dial_client = AsyncDial(
                 base_url=self.dial_endpoint,
                 api_key=tool_call_params.api_key,
             )
             
             # Get my_appdata_home path as files_home
-            files_home = dial_client.my_appdata_home()
+            files_home = await dial_client.my_appdata_home()
             
-            # Iterate through files
-            for file_ref in execution_result.files:
-                file_name = file_ref.name
-                mime_type = file_ref.mime_type
-                
-                # Get resource with mcp client by URL from file
-                resource_content = await self.mcp_client.get_resource(AnyUrl(file_ref.uri))
-                
-                # Check if text or binary content
-                text_types = ['text/', 'application/json', 'application/xml']
-                is_text = any(mime_type.startswith(t) for t in text_types)
-                
-                if is_text:
-                    # Text content - encode as bytes
-                    if isinstance(resource_content, str):
-                        file_bytes = resource_content.encode('utf-8')
-                    else:
-                        file_bytes = resource_content
-                else:
-                    # Binary content - decode from base64
-                    if isinstance(resource_content, str):
-                        file_bytes = base64.b64decode(resource_content)
-                    else:
-                        file_bytes = base64.b64decode(resource_content)
-                
-                # Prepare URL to upload downloaded file
-                upload_url = f"files/{(files_home / file_name).as_posix()}"
-                
-                # Upload file with DIAL client
-                dial_client.files.upload(upload_url, (file_name, file_bytes, mime_type))
-                
-                # Prepare Attachment
-                attachment = Attachment(
-                    url=upload_url,
-                    type=mime_type,
-                    title=file_name,
-                )
-                
-                # Add attachment to stage and choice
+            # Fetch and upload all files in parallel, bounded to not flood MCP server and DIAL core
+            semaphore = asyncio.Semaphore(_MAX_PARALLEL_FILE_TRANSFERS)
+            upload_urls = await asyncio.gather(*[
+                self._transfer_file(dial_client, files_home, file_ref, semaphore)
+                for file_ref in execution_result.files
+            ])
+            
+            # Add attachments to stage and choice in original order
+            for file_ref, upload_url in zip(execution_result.files, upload_urls):
                 stage.add_attachment(
                     url=upload_url,
-                    type=mime_type,
-                    title=file_name,
+                    type=file_ref.mime_type,
+                    title=file_ref.name,
                 )
                 tool_call_params.choice.add_attachment(
                     url=upload_url,
-                    type=mime_type,
-                    title=file_name,
+                    type=file_ref.mime_type,
+                    title=file_ref.name,
                 )
         
-        # 12. Truncate output to avoid high costs and context window overload
-        if execution_result.output:
+        # 12. Truncate output to avoid high costs and context window overload, unless large results are stored as files
+        if execution_result.output and tool_call_params.result_store is None:
             truncated_output = []
             for output_item in execution_result.output:
                 if len(output_item) > 1000:
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from task.tools.mcp.mcp_client import MCPClient
+from task.tools.py_interpreter._response import _ExecutionResult
+
+_WARMUP_CODE = """
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+"""
+
+
+class InterpreterSessionPool:
+    """
+    Maps conversations to PyInterpreter sessions and keeps a small pool of pre-started kernels
+    with common libraries already imported, so the first cell of a conversation doesn't pay
+    for kernel start and heavy imports.
+    Sessions idle longer than `idle_ttl` seconds are forgotten (the MCP server reclaims them on its side).
+    """
+
+    def __init__(
+            self,
+            mcp_client: MCPClient,
+            tool_name: str,
+            pool_size: int = 2,
+            idle_ttl: float = 1800,
+            warmup_code: str = _WARMUP_CODE,
+    ):
+        self.mcp_client = mcp_client
+        self.tool_name = tool_name
+        self.pool_size = pool_size
+        self.idle_ttl = idle_ttl
+        self.warmup_code = warmup_code
+        # conversation_id -> (session_id, last used)
+        self._sessions: dict[str, tuple[str, float]] = {}
+        # (session_id, started at) of warm sessions not yet bound to a conversation
+        self._warm: deque[tuple[str, float]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+
+    def acquire(self, conversation_id: str) -> Optional[str]:
+        """
+        Returns session bound to the conversation, binding a warm one if needed.
+        None means there is no session yet and a new one will be created by the call.
+        """
+        self._evict_idle()
+        now = time.monotonic()
+
+        if conversation_id in self._sessions:
+            session_id, _ = self._sessions[conversation_id]
+            self._sessions[conversation_id] = (session_id, now)
+            return session_id
+
+        session_id = self._warm.popleft()[0] if self._warm else None
+        if session_id:
+            self._sessions[conversation_id] = (session_id, now)
+        self.refill()
+        return session_id
+
+    def register(self, conversation_id: str, session_id: str) -> None:
+        self._sessions[conversation_id] = (session_id, time.monotonic())
+
+    def release(self, conversation_id: str) -> None:
+        """Forget the conversation session, e.g. when the server doesn't know it anymore."""
+        self._sessions.pop(conversation_id, None)
+
+    def refill(self) -> None:
+        """Starts warm sessions in background until pool is full."""
+        if self.pool_size <= 0 or (self._refill_task and not self._refill_task.done()):
+            return
+        self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while len(self._warm) < self.pool_size:
+            try:
+                session_id = await self._start_session()
+            except Exception as e:
+                print(f"[InterpreterSessionPool] Unable to start warm session: {e}")
+                return
+            if not session_id:
+                return
+            self._warm.append((session_id, time.monotonic()))
+
+    async def _start_session(self) -> Optional[str]:
+        result = await self.mcp_client.call_tool(self.tool_name, {"code": self.warmup_code})
+        execution_result = _ExecutionResult.model_validate_json(result)
+        if not execution_result.success or not execution_result.session_info:
+            print(f"[InterpreterSessionPool] Warmup failed: {execution_result.error}")
+            return None
+        return execution_result.session_info.session_id
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        for conversation_id in [c for c, (_, last_used) in self._sessions.items() if last_used < cutoff]:
+            del self._sessions[conversation_id]
+        while self._warm and self._warm[0][1] < cutoff:
+            self._warm.popleft()
@@ -0,0 +1,72 @@
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from task.utils.ttl_cache import TTLCache
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    answer: str
+    similarity: float
+
+
+@dataclass
+class _DocumentAnswers:
+    """Answers generated for one document, embeddings are stacked into a matrix for a single dot product."""
+
+    embeddings: np.ndarray
+    queries: list[str] = field(default_factory=list)
+    answers: list[str] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class SemanticAnswerCache:
+    """
+    Per-document cache of generated RAG answers keyed by query embedding.
+    A query whose cosine similarity with a cached one is at least `threshold` reuses its answer,
+    so paraphrased questions about the same document skip retrieval and LLM generation.
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.9,
+            max_answers_per_document: int = 64,
+            max_documents: int = 256,
+            ttl_seconds: float = 24 * 3600,
+    ):
+        self.threshold = threshold
+        self.max_answers_per_document = max_answers_per_document
+        self._documents = TTLCache(ttl_seconds=ttl_seconds, max_size=max_documents)
+
+    def get(self, document_key: str, query_embedding: np.ndarray) -> CachedAnswer | None:
+        document: _DocumentAnswers | None = self._documents.get(document_key)
+        if document is None:
+            return None
+        query_embedding = self._normalize(query_embedding)
+        with document.lock:
+            if not document.answers:
+                return None
+            scores = document.embeddings @ query_embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            return CachedAnswer(query=document.queries[best], answer=document.answers[best], similarity=float(scores[best]))
+
+    def set(self, document_key: str, query_embedding: np.ndarray, query: str, answer: str) -> None:
+        query_embedding = self._normalize(query_embedding)
+        document: _DocumentAnswers | None = self._documents.get(document_key)
+        if document is None:
+            document = _DocumentAnswers(embeddings=np.empty((0, query_embedding.shape[0]), dtype='float32'))
+            self._documents.set(document_key, document)
+        with document.lock:
+            document.embeddings = np.vstack([document.embeddings, query_embedding])[-self.max_answers_per_document:]
+            document.queries = (document.queries + [query])[-self.max_answers_per_document:]
+            document.answers = (document.answers + [answer])[-self.max_answers_per_document:]
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype='float32').reshape(-1)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
@@ -0,0 +1,101 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Iterator
+import sys
+
+
+class ChunkStore:
+    """
+    Document chunks kept as one UTF-8 buffer plus (start, end) byte offsets into it.
+
+    Overlapping chunk parts are stored once and there is no per-chunk string object, chunk strings are decoded
+    from the buffer on access. UTF-8 keeps mostly ASCII documents at ~1 byte per char, while a `str` buffer would
+    widen to 2-4 bytes per char for the whole document because of a single ligature or emoji.
+    Optional page numbers (1-based) are kept per chunk.
+    """
+
+    __slots__ = ("data", "starts", "ends", "pages")
+
+    def __init__(self, data: bytes, starts: array, ends: array, pages: array | None = None):
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+        self.pages = pages
+
+    @classmethod
+    def create(
+            cls,
+            text: str,
+            offsets: list[tuple[int, int]],
+            page_starts: list[int] | None = None,
+    ) -> 'ChunkStore':
+        """
+        Args:
+            text: Source document text, chunks are ranges of it
+            offsets: (start, end) char offsets of chunks, e.g. from `OffsetTextSplitter.split_offsets`
+            page_starts: Char offsets where pages start in text, page of chunk is the one its start falls into
+        """
+        pages = None
+        if page_starts and len(page_starts) > 1:
+            pages = array('l', [bisect_right(page_starts, start) for start, _ in offsets])
+
+        data = text.encode('utf-8')
+        starts = array('q', [start for start, _ in offsets])
+        ends = array('q', [end for _, end in offsets])
+        if len(data) != len(text):
+            # Non-ASCII text, char offsets differ from byte offsets
+            byte_offsets = cls._byte_offsets(text, set(starts) | set(ends))
+            starts = array('q', [byte_offsets[start] for start in starts])
+            ends = array('q', [byte_offsets[end] for end in ends])
+        return cls(data, starts, ends, pages)
+
+    @staticmethod
+    def _byte_offsets(text: str, positions: set[int]) -> dict[int, int]:
+        """Maps char positions to UTF-8 byte positions, encoding each span between positions once."""
+        byte_offsets = {}
+        previous = 0
+        byte_position = 0
+        for position in sorted(positions):
+            byte_position += len(text[previous:position].encode('utf-8'))
+            byte_offsets[position] = byte_position
+            previous = position
+        return byte_offsets
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.starts[i]:self.ends[i]].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        data = self.data
+        for start, end in zip(self.starts, self.ends):
+            yield data[start:end].decode('utf-8')
+
+    def page(self, i: int) -> int | None:
+        return self.pages[i] if self.pages is not None else None
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store."""
+        size = sys.getsizeof(self.data) + sys.getsizeof(self.starts) + sys.getsizeof(self.ends)
+        if self.pages is not None:
+            size += sys.getsizeof(self.pages)
+        return size
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "text": self.data.decode('utf-8'),
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "pages": self.pages.tolist() if self.pages is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'ChunkStore':
+        pages = data.get("pages")
+        return cls(
+            data=data["text"].encode('utf-8'),
+            starts=array('q', data["starts"]),
+            ends=array('q', data["ends"]),
+            pages=array('l', pages) if pages is not None else None,
+        )
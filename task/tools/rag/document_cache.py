@@ -1,24 +1,38 @@
 from datetime import datetime, time, timedelta
+from pathlib import Path
 from typing import Any, Tuple
+import hashlib
+import os
 import threading
 
+import faiss
+
+from task.tools.rag.chunk_store import ChunkStore
+from task.utils import serialization
+
 
 class DocumentCache:
     """
     Thread-safe document cache with automatic cleanup at midnight.
     Removes entries older than 24 hours.
+
+    With `directory` set, entries are also persisted there and read back memory-mapped, so worker processes
+    share built indexes through the page cache instead of each building and holding its own copy.
     """
 
-    def __init__(self):
+    def __init__(self, directory: str | None = None):
         self._cache: dict[str, Tuple[Any, Any, datetime]] = {}
         self._lock = threading.Lock()
         self._cleanup_thread = None
         self._stop_event = threading.Event()
         self._running = False
+        self._directory = Path(directory) if directory else None
+        if self._directory:
+            self._directory.mkdir(parents=True, exist_ok=True)
 
     @classmethod
-    def create(cls) ->'DocumentCache':
-        instance = cls()
+    def create(cls, directory: str | None = None) -> 'DocumentCache':
+        instance = cls(directory)
         instance.start_cleanup_task()
         return instance
 
@@ -30,7 +44,7 @@ class DocumentCache:
             key: Cache key
 
         Returns:
-            Tuple of (index, chunks) if found and not expired, None otherwise
+            Tuple of (index, chunk store) if found and not expired, None otherwise
         """
         with self._lock:
             if key in self._cache:
@@ -39,19 +53,27 @@ class DocumentCache:
                     return (index, chunks)
                 else:
                     del self._cache[key]
+
+        # Entry may have been built by another worker
+        entry = self._load(key)
+        if entry is None:
             return None
+        with self._lock:
+            self._cache[key] = entry
+        return entry[0], entry[1]
 
-    def set(self, key: str, index: Any, chunks: Any) -> None:
+    def set(self, key: str, index: Any, chunks: ChunkStore) -> None:
         """
         Store an entry in the cache.
 
         Args:
             key: Cache key
             index: FAISS index
-            chunks: Document chunks
+            chunks: Document chunk store
         """
         with self._lock:
             self._cache[key] = (index, chunks, datetime.now())
+        self._persist(key, index, chunks)
 
     def clear(self) -> None:
         """Clear all cached entries."""
@@ -78,10 +100,67 @@ class DocumentCache:
                 del self._cache[key]
 
             removed_count = len(keys_to_remove)
-            if removed_count > 0:
-                print(f"[DocumentCache] Cleaned up {removed_count} expired entries at {now}")
 
-            return removed_count
+        removed_count += self._cleanup_files(cutoff_time)
+        if removed_count > 0:
+            print(f"[DocumentCache] Cleaned up {removed_count} expired entries at {now}")
+
+        return removed_count
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        return self._directory / f"{name}.faiss", self._directory / f"{name}.chunks.json"
+
+    def _persist(self, key: str, index: Any, chunks: ChunkStore) -> None:
+        if not self._directory:
+            return
+        index_path, chunks_path = self._paths(key)
+        try:
+            # Chunks go first and index last, so readers only see complete entries
+            tmp_suffix = f".{os.getpid()}.tmp"
+            chunks_tmp = chunks_path.with_name(chunks_path.name + tmp_suffix)
+            chunks_tmp.write_text(serialization.dumps(chunks.to_dict()), encoding='utf-8')
+            os.replace(chunks_tmp, chunks_path)
+            index_tmp = index_path.with_name(index_path.name + tmp_suffix)
+            faiss.write_index(index, str(index_tmp))
+            os.replace(index_tmp, index_path)
+        except Exception as e:
+            print(f"[DocumentCache] Unable to persist entry: {e}")
+
+    def _load(self, key: str) -> Tuple[Any, Any, datetime] | None:
+        if not self._directory:
+            return None
+        index_path, chunks_path = self._paths(key)
+        try:
+            timestamp = datetime.fromtimestamp(index_path.stat().st_mtime)
+            if datetime.now() - timestamp >= timedelta(hours=24):
+                return None
+            chunks = ChunkStore.from_dict(serialization.loads(chunks_path.read_bytes()))
+            try:
+                # Flat index codes are mapped from file and shared between processes through page cache
+                index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP_IFC)
+            except (AttributeError, RuntimeError):
+                index = faiss.read_index(str(index_path))
+            return index, chunks, timestamp
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[DocumentCache] Unable to load entry: {e}")
+            return None
+
+    def _cleanup_files(self, cutoff_time: datetime) -> int:
+        if not self._directory:
+            return 0
+        removed_count = 0
+        for index_path in self._directory.glob("*.faiss"):
+            try:
+                if datetime.fromtimestamp(index_path.stat().st_mtime) < cutoff_time:
+                    index_path.unlink()
+                    index_path.with_name(index_path.name.replace(".faiss", ".chunks.json")).unlink(missing_ok=True)
+                    removed_count += 1
+            except FileNotFoundError:
+                continue
+        return removed_count
 
     def _schedule_midnight_cleanup(self) -> None:
         """Background thread that runs cleanup at midnight every day."""
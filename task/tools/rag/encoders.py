@@ -0,0 +1,220 @@
+"""
+Sentence encoders used for RAG indexing and tool selection.
+
+`SentenceTransformerEncoder` runs the model through PyTorch. `OnnxEncoder` runs the same model exported to ONNX
+through ONNX Runtime (optionally int8-quantized), without importing torch, and loads from a local directory
+prepared with `python -m task.tools.rag.encoders download --output <dir> [--quantize]`.
+Both produce L2-normalized float32 embeddings of all-MiniLM-L6-v2 (mean pooling + normalization).
+
+Parity of a local ONNX model with the PyTorch one: python -m task.tools.rag.encoders parity --model-dir <dir>
+"""
+import argparse
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+_ONNX_FILES = {False: "model.onnx", True: "model_int8.onnx"}
+
+
+class TextEncoder(ABC):
+    """Encodes texts to float32 embeddings of shape (len(texts), dimensions)."""
+
+    backend: str = ""
+
+    @property
+    @abstractmethod
+    def dimensions(self) -> int:
+        pass
+
+    @abstractmethod
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        pass
+
+
+class SentenceTransformerEncoder(TextEncoder):
+
+    backend = "sentence-transformers"
+
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', device: str = 'cpu'):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name_or_path=model_name, device=device)
+
+    @property
+    def dimensions(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype='float32')
+
+
+class OnnxEncoder(TextEncoder):
+    """
+    Runs exported transformer with ONNX Runtime and applies mean pooling and normalization in numpy.
+    Texts are sorted by length before batching so batches carry little padding.
+    """
+
+    backend = "onnx"
+
+    def __init__(
+            self,
+            model_dir: str,
+            quantized: bool = False,
+            max_length: int = 256,
+            num_threads: Optional[int] = None,
+    ):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("ONNX encoder requires `onnxruntime` and `tokenizers` packages to be installed") from e
+
+        self.model_path = _onnx_model_path(Path(model_dir), quantized)
+        if quantized:
+            self.backend = "onnx-int8"
+        self.num_threads = num_threads
+
+        self.tokenizer = Tokenizer.from_file(str(Path(model_dir) / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        # Session (and its thread pool) is created on first use, so encoder can be created before forking workers
+        self._onnxruntime = onnxruntime
+        self._session = None
+        self._input_names: set[str] = set()
+
+    @property
+    def session(self):
+        if self._session is None:
+            options = self._onnxruntime.SessionOptions()
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            self._session = self._onnxruntime.InferenceSession(
+                str(self.model_path), sess_options=options, providers=["CPUExecutionProvider"]
+            )
+            self._input_names = {i.name for i in self._session.get_inputs()}
+        return self._session
+
+    @property
+    def dimensions(self) -> int:
+        return self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimensions), dtype='float32')
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+        return embeddings
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype='int64')
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype='int64')
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        session = self.session
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype='int64')
+
+        token_embeddings = session.run(None, inputs)[0]
+        mask = attention_mask[..., None].astype('float32')
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+
+def _onnx_model_path(model_dir: Path, quantized: bool) -> Path:
+    # Both flat layout and Hugging Face repo layout (onnx/ subdirectory) are supported
+    for directory in (model_dir, model_dir / "onnx"):
+        path = directory / _ONNX_FILES[quantized]
+        if path.is_file():
+            return path
+    raise FileNotFoundError(f"{_ONNX_FILES[quantized]} not found in {model_dir}")
+
+
+def create_encoder(
+        backend: str = "sentence-transformers",
+        model_dir: Optional[str] = None,
+        num_threads: Optional[int] = None,
+) -> TextEncoder:
+    """
+    :param backend: sentence-transformers, onnx or onnx-int8
+    :param model_dir: local directory with ONNX model and tokenizer, required for onnx backends
+    :param num_threads: intra-op threads of ONNX Runtime session, all cores by default
+    """
+    if backend == "sentence-transformers":
+        return SentenceTransformerEncoder()
+    if backend in ("onnx", "onnx-int8"):
+        if not model_dir:
+            raise ValueError(f"Model directory is required for '{backend}' embedding backend")
+        return OnnxEncoder(model_dir=model_dir, quantized=backend == "onnx-int8", num_threads=num_threads)
+    raise ValueError(f"Unknown embedding backend '{backend}'")
+
+
+def check_parity(reference: TextEncoder, candidate: TextEncoder, texts: list[str]) -> dict[str, float]:
+    """Cosine similarity between embeddings of the same texts produced by two encoders."""
+    expected = reference.encode(texts)
+    actual = candidate.encode(texts)
+    expected = expected / np.maximum(np.linalg.norm(expected, axis=1, keepdims=True), 1e-12)
+    actual = actual / np.maximum(np.linalg.norm(actual, axis=1, keepdims=True), 1e-12)
+    cosine = (expected * actual).sum(axis=1)
+    return {"min_cosine": round(float(cosine.min()), 5), "mean_cosine": round(float(cosine.mean()), 5)}
+
+
+def download(output: str, quantize: bool) -> None:
+    """Downloads ONNX export and tokenizer of the model and optionally quantizes weights to int8."""
+    from huggingface_hub import snapshot_download
+
+    snapshot_download(
+        repo_id=MODEL_NAME,
+        local_dir=output,
+        allow_patterns=["onnx/model.onnx", "tokenizer.json", "tokenizer_config.json", "config.json"],
+    )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        onnx_dir = Path(output) / "onnx"
+        quantize_dynamic(
+            str(onnx_dir / _ONNX_FILES[False]),
+            str(onnx_dir / _ONNX_FILES[True]),
+            weight_type=QuantType.QInt8,
+        )
+    print(f"Model saved to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    download_parser = subparsers.add_parser("download")
+    download_parser.add_argument("--output", required=True)
+    download_parser.add_argument("--quantize", action="store_true")
+    parity_parser = subparsers.add_parser("parity")
+    parity_parser.add_argument("--model-dir", required=True)
+    parity_parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if args.command == "download":
+        download(args.output, args.quantize)
+        return
+
+    manual = Path(__file__).parents[3] / "tests" / "microwave_manual.txt"
+    texts = [p for p in manual.read_text(encoding="utf-8").split("\n\n") if p.strip()][:200]
+    reference = SentenceTransformerEncoder()
+    failed = False
+    for backend in ("onnx", "onnx-int8"):
+        try:
+            candidate = create_encoder(backend, args.model_dir)
+        except FileNotFoundError as e:
+            print(f"{backend}: skipped ({e})")
+            continue
+        parity = check_parity(reference, candidate, texts)
+        failed |= parity["min_cosine"] < args.min_cosine
+        print(f"{backend}: {parity}")
+    if failed:
+        raise SystemExit(f"Embedding parity below {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
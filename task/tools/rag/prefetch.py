@@ -0,0 +1,80 @@
+import asyncio
+from pathlib import PurePosixPath
+from urllib.parse import unquote, urlparse
+
+from aidial_sdk.chat_completion import Attachment
+
+from task.tools.rag.rag_tool import RagTool
+
+# Documents `rag_search` can extract text from, by attachment MIME type or file extension
+_SUPPORTED_TYPES = {"application/pdf", "text/plain", "text/csv", "text/html"}
+_SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".csv", ".html", ".htm"}
+
+
+class AttachmentPrefetcher:
+    """
+    Downloads, extracts and indexes newly attached files in background as soon as the request arrives,
+    so the first `rag_search` or `file_content_extraction` call finds them in cache
+    (or joins the running prefetch instead of starting its own).
+
+    Only documents `rag_search` supports are prefetched, images and other files are left to their tools.
+    At most `max_concurrency` files are prefetched at once across all requests.
+    Prefetch of a conversation is cancelled when its request is aborted, work already running in a thread
+    (download, embedding) finishes, but the following steps are skipped.
+    """
+
+    def __init__(self, rag_tool: RagTool, max_concurrency: int = 2, max_files_per_request: int = 8):
+        self.rag_tool = rag_tool
+        self.max_files_per_request = max_files_per_request
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: dict[str, set[asyncio.Task]] = {}
+
+    def start(self, attachments: list[Attachment], api_key: str, conversation_id: str) -> None:
+        file_urls = [
+            attachment.url or attachment.reference_url
+            for attachment in attachments
+            if self.is_supported(attachment)
+        ]
+        for file_url in list(dict.fromkeys(file_urls))[:self.max_files_per_request]:
+            # Skip documents already indexed for this conversation
+            if self.rag_tool.document_cache.get(self.rag_tool.document_key(conversation_id, file_url)):
+                continue
+            task = asyncio.create_task(self._prefetch(file_url, api_key, conversation_id))
+            tasks = self._tasks.setdefault(conversation_id, set())
+            tasks.add(task)
+            task.add_done_callback(lambda t, c=conversation_id: self._forget(c, t))
+
+    @staticmethod
+    def is_supported(attachment: Attachment) -> bool:
+        file_url = attachment.url or attachment.reference_url
+        if not file_url:
+            return False
+        if attachment.type and attachment.type.split(";")[0].strip().lower() in _SUPPORTED_TYPES:
+            return True
+        # Type may be missing or generic (application/octet-stream), fall back to the extension
+        return PurePosixPath(unquote(urlparse(file_url).path)).suffix.lower() in _SUPPORTED_EXTENSIONS
+
+    def cancel(self, conversation_id: str) -> int:
+        """Cancels running prefetch of the conversation, returns number of cancelled tasks."""
+        tasks = self._tasks.pop(conversation_id, set())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            print(f"[AttachmentPrefetcher] Cancelled {len(tasks)} prefetch tasks")
+        return len(tasks)
+
+    async def _prefetch(self, file_url: str, api_key: str, conversation_id: str) -> None:
+        async with self._semaphore:
+            try:
+                indexed = await self.rag_tool.index_document(file_url, api_key, conversation_id)
+                print(f"[AttachmentPrefetcher] {'Indexed' if indexed else 'No text content in'} {file_url}")
+            except Exception as e:
+                # Tool call will retry and report the error to the model
+                print(f"[AttachmentPrefetcher] Unable to prefetch {file_url}: {e}")
+
+    def _forget(self, conversation_id: str, task: asyncio.Task) -> None:
+        tasks = self._tasks.get(conversation_id)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[conversation_id]
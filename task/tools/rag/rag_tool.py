@@ -1,17 +1,24 @@
-import json
+import asyncio
 from typing import Any
 
 import faiss
 import numpy as np
 from aidial_client import AsyncDial
 from aidial_sdk.chat_completion import Message, Role
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 
 from task.tools.base import BaseTool
+from task.tools.files.document_loader import DocumentLoader
 from task.tools.models import ToolCallParams
+from task.tools.rag.answer_cache import SemanticAnswerCache
+from task.tools.rag.chunk_store import ChunkStore
 from task.tools.rag.document_cache import DocumentCache
-from task.utils.dial_file_conent_extractor import DialFileContentExtractor
+from task.tools.rag.encoders import TextEncoder, SentenceTransformerEncoder
+from task.tools.rag.text_splitter import OffsetTextSplitter
+from task.routing import RAG_ROUTE
+from task.upstream import UpstreamPolicy
+from task.utils.single_flight import SingleFlight
+from task.utils.stream_accumulator import StreamAccumulator
+from task.utils import serialization
 
 # System prompt for Generation step
 _SYSTEM_PROMPT = """
@@ -28,31 +35,47 @@ class RagTool(BaseTool):
     Supports: PDF, TXT, CSV, HTML.
     """
 
-    def __init__(self, endpoint: str, deployment_name: str, document_cache: DocumentCache):
+    def __init__(
+            self,
+            endpoint: str,
+            deployment_name: str,
+            document_cache: DocumentCache,
+            model: TextEncoder | None = None,
+            answer_cache: SemanticAnswerCache | None = None,
+            loader: DocumentLoader | None = None,
+            upstream_policy: UpstreamPolicy | None = None,
+    ):
         # 1. Set endpoint
         self.endpoint = endpoint
         # 2. Set deployment_name
         self.deployment_name = deployment_name
         # 3. Set document_cache
         self.document_cache = document_cache
-        # 4. Create SentenceTransformer model
-        self.model = SentenceTransformer(
-            model_name_or_path='all-MiniLM-L6-v2',
-            device='cpu'
-        )
-        # 5. Create RecursiveCharacterTextSplitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        # 4. Set encoder, create SentenceTransformer one if not shared by caller
+        self.model = model or SentenceTransformerEncoder()
+        # 5. Set semantic answer cache (optional)
+        self.answer_cache = answer_cache
+        # 6. Create OffsetTextSplitter (same chunks as langchain RecursiveCharacterTextSplitter)
+        self.text_splitter = OffsetTextSplitter(chunk_size=500, chunk_overlap=50)
+        # 7. Set document loader, shared with other file tools and attachment prefetch
+        self.loader = loader or DocumentLoader(endpoint)
+        # 8. Concurrent tool calls and prefetch of the same document build its index once
+        self._indexing = SingleFlight()
+        # 9. Set timeouts, retries and hedging of generation calls
+        self.upstream_policy = upstream_policy or UpstreamPolicy()
 
     @property
     def show_in_stage(self) -> bool:
         # Set as False since we will have custom variant of representation in Stage
         return False
 
+    @property
+    def memoize_ttl(self) -> float | None:
+        return 600
+
+    def memo_scope(self, tool_call_params: ToolCallParams) -> str:
+        return tool_call_params.deployment_for(RAG_ROUTE, self.deployment_name)
+
     @property
     def name(self) -> str:
         return "rag_search"
@@ -85,7 +108,7 @@ class RagTool(BaseTool):
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         # 1. Load arguments
-        arguments = json.loads(tool_call_params.tool_call.function.arguments)
+        arguments = serialization.loads(tool_call_params.tool_call.function.arguments)
         
         # 2. Get request from arguments
         request = arguments.get("request")
@@ -105,90 +128,144 @@ class RagTool(BaseTool):
         # 7. Append file URL to stage
         stage.append_content(f"**File URL**: {file_url}\n\r")
         
-        # 8. Create cache_document_key
-        cache_document_key = f"{tool_call_params.conversation_id}:{file_url}"
-        
-        # 9. Get from document_cache by cache_document_key
-        cached_data = self.document_cache.get(cache_document_key)
+        # 8. Create cache_document_key, resolve deployment routed for RAG in this request
+        cache_document_key = self.document_key(tool_call_params.conversation_id, file_url)
+        deployment_name = tool_call_params.deployment_for(RAG_ROUTE, self.deployment_name)
+        # Answers of different deployments are not mixed
+        answer_key = f"{cache_document_key}:{deployment_name}"
         
-        # 10. Use cache or create new index
-        if cached_data:
-            index, chunks = cached_data
-        else:
-            # Create DialFileContentExtractor and extract text
-            extractor = DialFileContentExtractor(
-                endpoint=self.endpoint,
-                api_key=tool_call_params.api_key
-            )
-            text_content = extractor.extract_text(file_url)
-            
-            # If no text_content
-            if not text_content:
-                stage.append_content("**Error**: File content not found.\n\r")
-                return "Error: File content not found."
-            
-            # Create chunks with text_splitter
-            chunks = self.text_splitter.split_text(text_content)
-            
-            # Create embeddings with model
-            embeddings = self.model.encode(chunks)
-            
-            # Create IndexFlatL2 with 384 dimensions
-            index = faiss.IndexFlatL2(384)
-            
-            # Add to index
-            index.add(np.array(embeddings).astype('float32'))
-            
-            # Add to document_cache
-            self.document_cache.set(cache_document_key, index, chunks)
-        
-        # 11. Prepare query_embedding
+        # 9. Prepare query_embedding
         query_embedding = self.model.encode([request]).astype('float32')
         
-        # 12. Search through index
+        # 10. Reuse answer to a similar question about the same document
+        if self.answer_cache:
+            cached_answer = self.answer_cache.get(answer_key, query_embedding[0])
+            if cached_answer:
+                stage.append_name(" (cached)")
+                stage.append_content(
+                    f"*Answer reused from similar question \"{cached_answer.query}\" "
+                    f"(similarity {cached_answer.similarity:.2f})*\n\r"
+                )
+                stage.append_content("## Response: \n")
+                stage.append_content(cached_answer.answer)
+                return cached_answer.answer
+        
+        # 11. Get index and chunks from document_cache, or wait for prefetch / build them
+        cached_data = await self.index_document(
+            file_url=file_url,
+            api_key=tool_call_params.api_key,
+            conversation_id=tool_call_params.conversation_id,
+        )
+        
+        # 12. If no text content in the document
+        if not cached_data:
+            stage.append_content("**Error**: File content not found.\n\r")
+            return "Error: File content not found."
+        index, chunks = cached_data
+        
+        # 13. Search through index
         distances, indices = index.search(query_embedding, k=3)
         
-        # 13. Get retrieved chunks
-        retrieved_chunks = [chunks[idx] for idx in indices[0] if idx < len(chunks)]
+        # 14. Get retrieved chunks
+        retrieved_chunks = [
+            f"[Page {chunks.page(idx)}]\n{chunks[idx]}" if chunks.page(idx) else chunks[idx]
+            for idx in indices[0] if 0 <= idx < len(chunks)
+        ]
         
-        # 14. Make augmentation
+        # 15. Make augmentation
         augmented_prompt = self.__augmentation(request, retrieved_chunks)
         
-        # 15. Append content to stage
+        # 16. Append content to stage
         stage.append_content("## RAG Request: \n")
         
-        # 16. Append augmented prompt to stage
+        # 17. Append augmented prompt to stage
         stage.append_content(f"```text\n\r{augmented_prompt}\n\r```\n\r")
         
-        # 17. Append response header to stage
+        # 18. Append response header to stage
         stage.append_content("## Response: \n")
         
-        # 18. Make Generation with AsyncDial
+        # 19. Make Generation with AsyncDial, on the deployment routed for RAG in this request
         client = AsyncDial(
             base_url=self.endpoint,
             api_key=tool_call_params.api_key,
+            **self.upstream_policy.client_options(),
         )
         
-        chunks_stream = await client.chat.completions.create(
-            deployment_name=self.deployment_name,
-            messages=[
-                {"role": "system", "content": _SYSTEM_PROMPT},
-                {"role": "user", "content": augmented_prompt}
-            ],
-            stream=True,
+        chunks_stream = await self.upstream_policy.stream(
+            lambda: client.chat.completions.create(
+                deployment_name=deployment_name,
+                messages=[
+                    {"role": "system", "content": _SYSTEM_PROMPT},
+                    {"role": "user", "content": augmented_prompt}
+                ],
+                stream=True,
+            ),
+            route=RAG_ROUTE,
+            deployment=deployment_name,
         )
         
         # Stream response to stage and collect content
-        collected_content = ""
-        async for chunk in chunks_stream:
-            if chunk.choices:
-                delta = chunk.choices[0].delta
-                if delta and delta.content:
-                    stage.append_content(delta.content)
-                    collected_content += delta.content
-        
-        # 19. Return collected content
-        return collected_content
+        with StreamAccumulator(stage.append_content) as accumulator:
+            async for chunk in chunks_stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta
+                    if delta and delta.content:
+                        accumulator.append(delta.content)
+        
+        # 20. Remember answer for similar questions and return collected content
+        if self.answer_cache and accumulator.content:
+            self.answer_cache.set(answer_key, query_embedding[0], request, accumulator.content)
+        return accumulator.content
+
+    @staticmethod
+    def document_key(conversation_id: str, file_url: str) -> str:
+        return f"{conversation_id}:{file_url}"
+
+    async def index_document(self, file_url: str, api_key: str, conversation_id: str) -> tuple[Any, ChunkStore] | None:
+        """
+        Returns (index, chunks) of the document from document_cache, downloading and indexing it if absent.
+        Returns None when the document has no text content.
+        """
+        cache_document_key = self.document_key(conversation_id, file_url)
+        cached_data = self.document_cache.get(cache_document_key)
+        if cached_data:
+            return cached_data
+        return await self._indexing.run(
+            cache_document_key,
+            lambda: self._build_document(cache_document_key, file_url, api_key),
+        )
+
+    async def _build_document(self, cache_document_key: str, file_url: str, api_key: str) -> tuple[Any, ChunkStore] | None:
+        # 1. Load text per page with DocumentLoader
+        pages = await self.loader.load_pages(file_url, api_key)
+        if not any(pages):
+            return None
+        
+        # 2. Split, embed and index off the event loop
+        index, chunks = await asyncio.to_thread(self._index_pages, pages)
+        
+        # 3. Add to document_cache
+        self.document_cache.set(cache_document_key, index, chunks)
+        return index, chunks
+
+    def _index_pages(self, pages: list[str]) -> tuple[Any, ChunkStore]:
+        text_content = '\n'.join(pages)
+        
+        # Create chunks with text_splitter, kept as offsets into text_content with page numbers
+        page_starts = []
+        offset = 0
+        for page in pages:
+            page_starts.append(offset)
+            offset += len(page) + 1
+        chunks = ChunkStore.create(text_content, self.text_splitter.split_offsets(text_content), page_starts)
+        
+        # Create embeddings with model
+        embeddings = self.model.encode(list(chunks))
+        
+        # Create IndexFlatL2 with encoder dimensions (384) and add embeddings
+        index = faiss.IndexFlatL2(self.model.dimensions)
+        index.add(np.array(embeddings).astype('float32'))
+        return index, chunks
 
     def __augmentation(self, request: str, chunks: list[str]) -> str:
         # Make prompt augmentation
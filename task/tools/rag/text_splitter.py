@@ -0,0 +1,94 @@
+import re
+
+_DEFAULT_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+class OffsetTextSplitter:
+    """
+    Recursive character text splitter working with (start, end) offsets into the source text.
+
+    Produces the same chunks as langchain `RecursiveCharacterTextSplitter` with `length_function=len` and
+    default `keep_separator`/`strip_whitespace`, but never slices the text while splitting: separators are
+    searched within bounds of the original string and pieces are merged by offsets, so the text is copied
+    only once, when chunk strings are finally requested.
+    """
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, separators: list[str] | None = None):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"Chunk overlap ({chunk_overlap}) is larger than chunk size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or _DEFAULT_SEPARATORS
+        self._patterns = {separator: re.compile(re.escape(separator)) for separator in self.separators if separator}
+
+    def split_text(self, text: str) -> list[str]:
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_offsets(self, text: str) -> list[tuple[int, int]]:
+        offsets: list[tuple[int, int]] = []
+        self._split(text, 0, len(text), self.separators, offsets)
+        return offsets
+
+    def _split(self, text: str, start: int, end: int, separators: list[str], out: list[tuple[int, int]]) -> None:
+        # Use the first separator present in the range, pieces longer than chunk size are split with the next ones
+        separator = separators[-1]
+        next_separators: list[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                next_separators = separators[i + 1:]
+                break
+
+        good_pieces: list[tuple[int, int]] = []
+        for piece in self._pieces(text, start, end, separator):
+            if piece[1] - piece[0] < self.chunk_size:
+                good_pieces.append(piece)
+                continue
+            if good_pieces:
+                self._merge(text, good_pieces, out)
+                good_pieces = []
+            if next_separators:
+                self._split(text, piece[0], piece[1], next_separators, out)
+            else:
+                out.append(piece)
+        if good_pieces:
+            self._merge(text, good_pieces, out)
+
+    def _pieces(self, text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
+        """Splits range by separator, separator is kept at the start of the following piece."""
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+        boundaries = [start]
+        boundaries.extend(match.start() for match in self._patterns[separator].finditer(text, start, end))
+        boundaries.append(end)
+        return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+
+    def _merge(self, text: str, pieces: list[tuple[int, int]], out: list[tuple[int, int]]) -> None:
+        """Merges adjacent pieces into chunks up to chunk size, carrying up to chunk overlap into the next chunk."""
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
+        # Pieces are adjacent, so current chunk is [pieces[head][0], pieces[i - 1][1])
+        head = 0
+        total = 0
+        for i, (piece_start, piece_end) in enumerate(pieces):
+            length = piece_end - piece_start
+            if total + length > chunk_size and head < i:
+                self._append_stripped(text, pieces[head][0], pieces[i - 1][1], out)
+                while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                    total -= pieces[head][1] - pieces[head][0]
+                    head += 1
+            total += length
+        if head < len(pieces):
+            self._append_stripped(text, pieces[head][0], pieces[-1][1], out)
+
+    @staticmethod
+    def _append_stripped(text: str, start: int, end: int, out: list[tuple[int, int]]) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            out.append((start, end))
@@ -0,0 +1,69 @@
+from typing import Any, Callable, Optional
+
+import fastjsonschema
+from aidial_client.types.chat import ToolParam
+
+from task.tools.base import BaseTool
+from task.utils import serialization
+
+
+class ToolRegistry:
+    """
+    Registry of agent tools. Freezes each tool schema once and compiles a JSON Schema validator
+    for tool arguments at startup, so invalid tool calls are rejected before any tool work starts.
+    """
+
+    def __init__(self, tools: list[BaseTool]):
+        self._tools: dict[str, BaseTool] = {}
+        self._schemas: dict[str, ToolParam] = {}
+        self._validators: dict[str, Callable[[Any], Any]] = {}
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool: BaseTool) -> None:
+        self._tools[tool.name] = tool
+        self._schemas[tool.name] = tool.schema
+        try:
+            self._validators[tool.name] = fastjsonschema.compile(tool.parameters or {}, use_default=False)
+        except Exception as e:
+            # Validation is skipped, tool itself still handles its arguments
+            print(f"[ToolRegistry] Unable to compile parameters schema of '{tool.name}': {e}")
+
+    def get(self, name: str) -> Optional[BaseTool]:
+        return self._tools.get(name)
+
+    @property
+    def tools(self) -> list[BaseTool]:
+        return list(self._tools.values())
+
+    @property
+    def schemas(self) -> list[ToolParam]:
+        return list(self._schemas.values())
+
+    def schemas_for(self, names: set[str]) -> list[ToolParam]:
+        """Schemas of given tools, in registration order."""
+        return [schema for name, schema in self._schemas.items() if name in names]
+
+    def validate(self, name: str, arguments: str) -> Optional[str]:
+        """
+        Validates raw tool call arguments.
+
+        Returns:
+            Error description if arguments are invalid, None otherwise
+        """
+        try:
+            parsed_arguments = serialization.loads(arguments or "{}")
+        except ValueError as e:
+            return f"Arguments are not valid JSON: {e}"
+
+        validator = self._validators.get(name)
+        if validator is None:
+            return None
+        try:
+            validator(parsed_arguments)
+        except fastjsonschema.JsonSchemaValueException as e:
+            return e.message.replace("data", "arguments", 1)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._tools)
@@ -0,0 +1,45 @@
+import hashlib
+from pathlib import PurePosixPath
+
+from aidial_client import AsyncDial
+
+# Name of the tool that reads ranges of stored results
+READ_TOOL_RESULT_NAME = "read_tool_result"
+
+
+class ToolResultStore:
+    """
+    Stores large tool results as DIAL files so only a compact preview with a reference goes to the model,
+    to the tool call history and to the state replayed on every later turn.
+    """
+
+    def __init__(self, endpoint: str, threshold: int = 8_000, preview_chars: int = 2_000):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+
+    def should_store(self, content: str | None) -> bool:
+        return bool(content) and len(content) > self.threshold
+
+    async def store(self, content: str, api_key: str, conversation_id: str, tool_call_id: str) -> str:
+        """Uploads result content and returns its DIAL file URL."""
+        client = AsyncDial(base_url=self.endpoint, api_key=api_key)
+        conversation_dir = hashlib.sha256(conversation_id.encode('utf-8')).hexdigest()[:16]
+        file_path = PurePosixPath("tool_results") / conversation_dir / f"{tool_call_id}.txt"
+
+        appdata_home = await client.my_appdata_home()
+        if appdata_home:
+            url = f"files/{(appdata_home / file_path).as_posix()}"
+        else:
+            url = (await client.my_files_home() / file_path).as_posix()
+
+        await client.files.upload(url, (file_path.name, content.encode('utf-8'), "text/plain"))
+        return url
+
+    def preview(self, content: str, url: str) -> str:
+        return (
+            f"{content[:self.preview_chars]}\n\n"
+            f"[Result is too large and was truncated: showing {self.preview_chars} of {len(content)} characters. "
+            f"Full result is stored at `{url}`. To read other parts call `{READ_TOOL_RESULT_NAME}` "
+            f"with this `result_url`, `offset` (character position) and `length`.]"
+        )
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Any
+
+import numpy as np
+
+from task.tools.base import BaseTool
+
+
+class ToolSelector:
+    """
+    Selects tools relevant to the user message, so the LLM gets only top-k tool schemas
+    instead of the whole catalog. Tool descriptions are embedded once at startup.
+    """
+
+    def __init__(self, model: Any, tools: list[BaseTool], top_k: int, always_include: set[str] | None = None):
+        """
+        :param model: sentence embedding model with `encode` (e.g. TextEncoder)
+        :param always_include: names of tools that are sent regardless of relevance
+        """
+        self.model = model
+        self.top_k = top_k
+        self.always_include = always_include or set()
+        self._tool_names = [tool.name for tool in tools]
+        self._embeddings = self._encode([f"{tool.name}: {tool.description}" for tool in tools])
+
+    async def select(self, query: str, used_tool_names: set[str]) -> set[str]:
+        """
+        Returns names of top-k tools relevant to query,
+        together with tools already used in the conversation and always included ones.
+        """
+        selected = set(self.always_include) | (used_tool_names & set(self._tool_names))
+        if not query or len(self._tool_names) <= self.top_k:
+            return set(self._tool_names)
+
+        query_embedding = (await asyncio.to_thread(self._encode, [query]))[0]
+        scores = self._embeddings @ query_embedding
+        for index in np.argsort(-scores)[:self.top_k]:
+            selected.add(self._tool_names[index])
+        return selected
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        embeddings = np.asarray(self.model.encode(texts), dtype='float32')
+        # Normalize so dot product is cosine similarity
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
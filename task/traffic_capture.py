@@ -0,0 +1,148 @@
+import hashlib
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from task.utils import serialization
+from task.utils.constants import TOOL_CALL_HISTORY_COMPRESSED_KEY, TOOL_CALL_HISTORY_REF_KEY
+from task.utils.state_store import StateCodec
+
+# String values of these keys describe structure, not user data, and are kept as is
+_STRUCTURAL_KEYS = {"role", "type", "finish_reason", "mime_type", "model", "deployment_name"}
+_ID_KEYS = {"id", "tool_call_id", TOOL_CALL_HISTORY_REF_KEY}
+_URL_KEYS = {"url", "reference_url", "result_url", "file_url"}
+_LETTERS = re.compile(r"[^\W\d_]")
+_DIGITS = re.compile(r"\d")
+_STATE_CODEC = StateCodec()
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+
+
+def _mask(text: str) -> str:
+    # Length, whitespace and punctuation are preserved so payload sizes and token counts stay realistic
+    return _DIGITS.sub("0", _LETTERS.sub("x", text))
+
+
+def anonymize(value: Any, key: str | None = None) -> Any:
+    """Masks user text, hashes ids and file URLs, keeps message structure and tool names."""
+    if isinstance(value, dict):
+        if TOOL_CALL_HISTORY_COMPRESSED_KEY in value:
+            # Compressed history can't be masked as is, expand it so its structure is kept
+            value = _STATE_CODEC.unpack(value)
+        # `name` is a tool name only in function calls and tool messages, elsewhere it may be a user or file name
+        keep_name = key == "function" or value.get("role") == "tool"
+        return {k: v if k == "name" and keep_name else anonymize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [anonymize(item, key) for item in value]
+    if not isinstance(value, str) or key in _STRUCTURAL_KEYS:
+        return value
+    if key in _ID_KEYS:
+        return _hash(value)
+    if key in _URL_KEYS:
+        suffix = Path(value).suffix
+        return f"files/anonymized/{_hash(value)}{suffix}"
+    return _mask(value)
+
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware that records anonymized chat completion requests with their timing to JSONL,
+    so production load patterns can be replayed against a local instance (see benchmarks/e2e/replay.py).
+
+    Each line contains request offset from capture start, hashed api key and conversation id, anonymized body,
+    response status, time to first response byte and total duration.
+    Anonymization and file writes are done by a background writer thread, requests only enqueue what they captured,
+    when `max_queue` records are waiting new ones are dropped.
+    """
+
+    def __init__(self, app: Callable, path: str, sample_rate: float = 1.0, max_queue: int = 1024):
+        self.app = app
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self._started = time.monotonic()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._writer = threading.Thread(target=self._write_records, name="traffic-capture-writer", daemon=True)
+        self._writer.start()
+        print(f"[TrafficCaptureMiddleware] Capturing {sample_rate:.0%} of chat completions to {self.path}")
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if (
+                scope["type"] != "http"
+                or scope["method"] != "POST"
+                or not scope["path"].endswith("/chat/completions")
+                or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        body_parts: list[bytes] = []
+        response = {"status": None, "first_byte": None, "bytes": 0}
+
+        async def capture_receive() -> dict:
+            message = await receive()
+            if message["type"] == "http.request":
+                body_parts.append(message.get("body", b""))
+            return message
+
+        async def capture_send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body" and message.get("body"):
+                if response["first_byte"] is None:
+                    response["first_byte"] = time.monotonic()
+                response["bytes"] += len(message["body"])
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            try:
+                self._queue.put_nowait((scope, b"".join(body_parts), start, time.monotonic(), response))
+            except queue.Full:
+                print("[TrafficCaptureMiddleware] Writer is behind, request not recorded")
+
+    def _write_records(self) -> None:
+        while True:
+            line = self._record(*self._queue.get())
+            if not line:
+                continue
+            try:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"[TrafficCaptureMiddleware] Unable to write record: {e}")
+
+    def _record(self, scope: dict, body: bytes, start: float, end: float, response: dict) -> str | None:
+        try:
+            headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get("headers", [])}
+            try:
+                payload = anonymize(serialization.loads(body)) if body else None
+            except ValueError:
+                payload = None
+            record = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "offset_s": round(start - self._started, 3),
+                "path": scope["path"],
+                "api_key": _hash(headers["api-key"]) if headers.get("api-key") else None,
+                "conversation_id": _hash(headers["x-conversation-id"]) if headers.get("x-conversation-id") else None,
+                "body": payload,
+                "request_bytes": len(body),
+                "status": response["status"],
+                "first_byte_ms": round((response["first_byte"] - start) * 1000, 1) if response["first_byte"] else None,
+                "duration_ms": round((end - start) * 1000, 1),
+                "response_bytes": response["bytes"],
+            }
+            return serialization.dumps(record) + "\n"
+        except Exception as e:
+            # Capture must never break request handling
+            print(f"[TrafficCaptureMiddleware] Unable to record request: {e}")
+            return None
@@ -0,0 +1,248 @@
+import asyncio
+import math
+import random
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+
+# Statuses worth another attempt: timeouts, rate limits and upstream/gateway failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class UpstreamMetrics:
+    """
+    Counters, latency and token usage of upstream LLM calls per route (agent, rag, web_search, deployment name, ...).
+    Latency percentiles are computed over the last `window` calls of a route.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._first_token_latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def increment(self, route: str, counter: str, value: int = 1) -> None:
+        self._counters[route][counter] += value
+
+    def observe(
+            self,
+            route: str,
+            latency: float,
+            first_token_latency: float | None,
+            prompt_tokens: int = 0,
+            completion_tokens: int = 0,
+    ) -> None:
+        self._latencies[route].append(latency)
+        if first_token_latency is not None:
+            self._first_token_latencies[route].append(first_token_latency)
+        self.increment(route, "prompt_tokens", prompt_tokens)
+        self.increment(route, "completion_tokens", completion_tokens)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        snapshot: dict[str, dict[str, Any]] = {}
+        for route, counters in self._counters.items():
+            snapshot[route] = dict(counters)
+            if latencies := self._latencies.get(route):
+                snapshot[route]["latency_ms"] = self._percentiles_ms(latencies)
+            if first_token_latencies := self._first_token_latencies.get(route):
+                snapshot[route]["first_token_ms"] = self._percentiles_ms(first_token_latencies)
+        return snapshot
+
+    @staticmethod
+    def _percentiles_ms(samples: deque[float]) -> dict[str, float]:
+        ordered = sorted(samples)
+        return {
+            f"p{p}": round(ordered[max(0, math.ceil(len(ordered) * p / 100) - 1)] * 1000, 1)
+            for p in (50, 95, 99)
+        }
+
+
+class UpstreamPolicy:
+    """
+    Timeouts, retries and hedging for streaming chat completion calls to upstream deployments.
+
+    An attempt fails when the TCP connection isn't established within `connect_timeout` (bounded by the HTTP client)
+    or response headers and the first chunk don't arrive within `first_token_timeout`. Failed attempts with retryable errors are repeated up to `max_retries`
+    times with exponential backoff and full jitter. With `hedge_delay` set, a second attempt is started when
+    the first chunk of the first one is late, the one that delivers first wins and the other is cancelled.
+    Once a chunk is handed to the caller the call is never repeated, so streamed output is not duplicated.
+    """
+
+    def __init__(
+            self,
+            connect_timeout: float = 10.0,
+            first_token_timeout: float = 60.0,
+            max_retries: int = 2,
+            backoff_base: float = 0.5,
+            backoff_max: float = 8.0,
+            hedge_delay: float = 0.0,
+            metrics: UpstreamMetrics | None = None,
+    ):
+        """
+        :param first_token_timeout: seconds from attempt start to the first chunk, 0 disables it
+        :param hedge_delay: seconds without the first chunk before a hedged attempt is started, 0 disables hedging
+        """
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_delay = hedge_delay
+        self.metrics = metrics or UpstreamMetrics()
+
+    def client_options(self) -> dict[str, Any]:
+        """AsyncDial options: retries are done by the policy, client only bounds connection time."""
+        return {
+            "max_retries": 0,
+            "timeout": httpx.Timeout(timeout=600.0, connect=self.connect_timeout),
+        }
+
+    async def stream(
+            self,
+            create: Callable[[], Awaitable[AsyncIterator[Any]]],
+            route: str,
+            deployment: str | None = None,
+            first_token_timeout: float | None = None,
+            hedge: bool = True,
+            retry: bool = True,
+    ) -> AsyncIterator[Any]:
+        """
+        Starts the streaming call created by `create` (e.g. `lambda: client.chat.completions.create(..., stream=True)`)
+        and returns its chunks.
+
+        Args:
+            create: Factory of the call, invoked once per attempt
+            route: Name the call is counted under in metrics
+            deployment: Deployment the route is served by, metrics are kept per route and deployment
+            first_token_timeout: Overrides policy first token timeout, 0 disables it
+            hedge: Allow hedged attempts, disable for calls with side effects or high cost
+            retry: Allow repeated attempts after failures, disable for calls that are billed even when they fail
+        """
+        if deployment and deployment != route:
+            route = f"{route}:{deployment}"
+        self.metrics.increment(route, "calls")
+        timeout = self.first_token_timeout if first_token_timeout is None else first_token_timeout
+        started_at = asyncio.get_running_loop().time()
+        attempt = 0
+        while True:
+            try:
+                first_chunk, stream = await self._first_chunk(create, route, timeout, hedge)
+                break
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics.increment(route, "timeouts")
+                if not retry or attempt >= self.max_retries or not self.is_retryable(e):
+                    self.metrics.increment(route, "errors")
+                    raise
+                attempt += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                self.metrics.increment(route, "retries")
+                print(f"[UpstreamPolicy] {route}: retry {attempt}/{self.max_retries} in {delay:.2f}s after {self._describe(e)}")
+                await asyncio.sleep(delay)
+        first_token_latency = asyncio.get_running_loop().time() - started_at if first_chunk is not None else None
+        return self._chunks(first_chunk, stream, route, started_at, first_token_latency)
+
+    @staticmethod
+    def is_retryable(error: BaseException) -> bool:
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+    async def _first_chunk(
+            self,
+            create: Callable[[], Awaitable[AsyncIterator[Any]]],
+            route: str,
+            timeout: float,
+            hedge: bool,
+    ) -> tuple[Any, AsyncIterator[Any]]:
+        primary = asyncio.create_task(self._attempt(create, timeout))
+        if not hedge or self.hedge_delay <= 0:
+            return await primary
+
+        pending = {primary}
+        winner: asyncio.Task | None = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                pending = set()
+                return primary.result()
+
+            self.metrics.increment(route, "hedges")
+            hedged = asyncio.create_task(self._attempt(create, timeout))
+            pending.add(hedged)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if winner is None:
+                            winner = task
+                        else:
+                            # Both delivered at once, drop the loser's stream
+                            await self._close(task.result()[1])
+            if winner is None:
+                # Both attempts failed, report the original one
+                return primary.result()
+            if winner is hedged:
+                self.metrics.increment(route, "hedge_wins")
+            return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, create: Callable[[], Awaitable[AsyncIterator[Any]]], timeout: float) -> tuple[Any, AsyncIterator[Any]]:
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        # Time to response headers counts towards first token, slow upstream queueing is not a connect failure
+        stream = await asyncio.wait_for(create(), timeout=timeout if timeout > 0 else None)
+        try:
+            remaining = max(0.0, timeout - (loop.time() - started_at)) if timeout > 0 else None
+            return await asyncio.wait_for(anext(stream), timeout=remaining), stream
+        except StopAsyncIteration:
+            return None, stream
+        except BaseException:
+            await self._close(stream)
+            raise
+
+    async def _chunks(
+            self,
+            first_chunk: Any,
+            stream: AsyncIterator[Any],
+            route: str,
+            started_at: float,
+            first_token_latency: float | None,
+    ) -> AsyncIterator[Any]:
+        usage = None
+        try:
+            if first_chunk is None:
+                return
+            usage = getattr(first_chunk, "usage", None)
+            yield first_chunk
+            async for chunk in stream:
+                # Usage normally comes with the last chunk
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            await self._close(stream)
+            self.metrics.observe(
+                route,
+                latency=asyncio.get_running_loop().time() - started_at,
+                first_token_latency=first_token_latency,
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            )
+
+    @staticmethod
+    async def _close(stream: AsyncIterator[Any]) -> None:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _describe(error: BaseException) -> str:
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        status_code = getattr(error, "status_code", None)
+        return f"{type(error).__name__} {status_code}" if status_code else type(error).__name__
@@ -1,2 +1,4 @@
 TOOL_CALL_HISTORY_KEY = "tool_call_history"
+TOOL_CALL_HISTORY_COMPRESSED_KEY = "tool_call_history_z"
+TOOL_CALL_HISTORY_REF_KEY = "tool_call_history_ref"
 CUSTOM_CONTENT = "custom_content"
\ No newline at end of file
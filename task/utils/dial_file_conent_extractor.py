@@ -14,6 +14,10 @@ class DialFileContentExtractor:
         self.client = Dial(base_url=endpoint, api_key=api_key)
 
     def extract_text(self, file_url: str) -> str:
+        return '\n'.join(self.extract_pages(file_url))
+
+    def extract_pages(self, file_url: str) -> list[str]:
+        """Extracts text per page, documents without pages (TXT, CSV, HTML) are returned as a single page."""
         # 1. Download file by file_url
         downloaded_file = self.client.files.download(file_url)
         
@@ -24,29 +28,29 @@ class DialFileContentExtractor:
         # 3. Get file extension
         file_extension = Path(filename).suffix.lower()
         
-        # 4. Call __extract_text and return its result
-        return self.__extract_text(file_content, file_extension, filename)
+        # 4. Call __extract_pages and return its result
+        return self.__extract_pages(file_content, file_extension, filename)
 
-    def __extract_text(self, file_content: bytes, file_extension: str, filename: str) -> str:
+    def __extract_pages(self, file_content: bytes, file_extension: str, filename: str) -> list[str]:
         """Extract text content based on file type."""
         try:
             # 1. Handle .txt files
             if file_extension == '.txt':
-                return file_content.decode('utf-8', errors='ignore')
+                return [file_content.decode('utf-8', errors='ignore')]
             
             # 2. Handle .pdf files
             if file_extension == '.pdf':
                 pdf_bytes = io.BytesIO(file_content)
                 with pdfplumber.open(pdf_bytes) as pdf:
                     pages_text = [page.extract_text() or '' for page in pdf.pages]
-                return '\n'.join(pages_text)
+                return pages_text
             
             # 3. Handle .csv files
             if file_extension == '.csv':
                 decoded_text_content = file_content.decode('utf-8', errors='ignore')
                 csv_buffer = io.StringIO(decoded_text_content)
                 dataframe = pd.read_csv(csv_buffer)
-                return dataframe.to_markdown(index=False)
+                return [dataframe.to_markdown(index=False)]
             
             # 4. Handle .html and .htm files
             if file_extension in ['.html', '.htm']:
@@ -55,11 +59,11 @@ class DialFileContentExtractor:
                 # Remove script and style elements
                 for script in soup(["script", "style"]):
                     script.decompose()
-                return soup.get_text(separator='\n', strip=True)
+                return [soup.get_text(separator='\n', strip=True)]
             
             # 5. Default: return decoded content
-            return file_content.decode('utf-8', errors='ignore')
+            return [file_content.decode('utf-8', errors='ignore')]
             
         except Exception as e:
             print(f"Error extracting text from {filename}: {e}")
-            return ""
+            return []
@@ -1,19 +1,60 @@
 import copy
-from typing import Any
+from typing import Any, Optional
 
-from aidial_sdk.chat_completion import Message, Role
+from aidial_sdk.chat_completion import Attachment, Message, Role
 
 from task.utils.constants import TOOL_CALL_HISTORY_KEY, CUSTOM_CONTENT
+from task.utils.state_store import StateCodec
 
+_DEFAULT_STATE_CODEC = StateCodec()
 
-def unpack_messages(messages: list[Message], state_history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+
+def attachment_urls(message: Message) -> list[str]:
+    """URLs of files attached to the message, as they are shown to the model."""
+    if not message.custom_content or not message.custom_content.attachments:
+        return []
+    return [
+        attachment.url or attachment.reference_url
+        for attachment in message.custom_content.attachments
+        if attachment.url or attachment.reference_url
+    ]
+
+
+def latest_attachments(messages: list[Message]) -> list[Attachment]:
+    """Files attached to the latest user message, i.e. the ones new in this request."""
+    for message in reversed(messages):
+        if message.role == Role.USER:
+            if not message.custom_content or not message.custom_content.attachments:
+                return []
+            return [
+                attachment
+                for attachment in message.custom_content.attachments
+                if attachment.url or attachment.reference_url
+            ]
+    return []
+
+
+def unpack_messages(
+        messages: list[Message],
+        state_history: list[dict[str, Any]],
+        state_codec: Optional[StateCodec] = None,
+        unpacked_states: Optional[list[Optional[dict[str, Any]]]] = None,
+) -> list[dict[str, Any]]:
+    """
+    Args:
+        unpacked_states: States of messages already rehydrated by `state_codec` (aligned with messages),
+            avoids unpacking them again on every agent round
+    """
+    state_codec = state_codec or _DEFAULT_STATE_CODEC
     result: list[dict[str, Any]] = []
-    for message in messages:
+    for i, message in enumerate(messages):
         if message.role == Role.ASSISTANT:
             if custom_content := message.custom_content:
                 # Unpack tool call history from Assistant message State
                 state = custom_content.state
                 if state and isinstance(state, dict):
+                    # Rehydrate compressed or server-side stored history
+                    state = unpacked_states[i] if unpacked_states is not None else state_codec.unpack(state)
                     tool_call_history = state.get(TOOL_CALL_HISTORY_KEY)
                     if tool_call_history and isinstance(tool_call_history, list):
                         for history_msg in tool_call_history:
@@ -33,13 +74,10 @@ def unpack_messages(messages: list[Message], state_history: list[dict[str, Any]]
                     result.append(msg.dict(exclude_none=True))
         else:
             attachments_urls_content = ''
-            if message.custom_content and message.custom_content.attachments:
+            if urls := attachment_urls(message):
                 attachments_urls_content = '\n\nAttached files URLs:\n'
-                for attachment in message.custom_content.attachments:
-                    if attachment.url:
-                        attachments_urls_content += f"{attachment.url}\n"
-                    elif attachment.reference_url:
-                        attachments_urls_content += f"{attachment.reference_url}\n"
+                for url in urls:
+                    attachments_urls_content += f"{url}\n"
 
             content = message.content or ''
             if attachments_urls_content:
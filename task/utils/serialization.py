@@ -0,0 +1,69 @@
+"""
+Single entry point for JSON serialization in the agent.
+Uses orjson when it is installed and falls back to the standard library otherwise.
+Both backends produce compact UTF-8 JSON (no ASCII escaping) and raise ValueError subclasses on invalid input.
+Integers wider than 64 bits, which orjson rejects on dump and turns into floats on load, go through the standard library.
+"""
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# 64-bit integers have at most 20 digits, longer digit runs may be big integers orjson can't keep exact.
+# Runs are found by mapping digits to "0" and everything else to " ", it's several times faster than a regex scan
+_DIGITS_TABLE = bytes(0x30 if 0x30 <= i <= 0x39 else 0x20 for i in range(256))
+_LONG_DIGIT_RUN = b"0" * 20
+
+
+def dumps(
+        obj: Any,
+        indent: bool = False,
+        sort_keys: bool = False,
+        default: Optional[Callable[[Any], Any]] = None,
+) -> str:
+    """
+    Serializes obj to JSON string.
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty print with 2 spaces indent
+        sort_keys: Sort dict keys (canonical form)
+        default: Called for objects that can't be serialized natively
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+        except TypeError:
+            # Integers exceeding 64-bit range and other input only the standard library accepts
+            pass
+    return json.dumps(
+        obj,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        sort_keys=sort_keys,
+        default=default,
+        ensure_ascii=False,
+    )
+
+
+def loads(data: str | bytes) -> Any:
+    """Parses JSON string or bytes."""
+    if orjson is not None:
+        try:
+            raw = data.encode('utf-8') if isinstance(data, str) else data
+        except UnicodeEncodeError:
+            # Lone surrogates are accepted by the standard library only
+            raw = None
+        if raw is not None and _LONG_DIGIT_RUN not in raw.translate(_DIGITS_TABLE):
+            return orjson.loads(raw)
+    return json.loads(data)
@@ -0,0 +1,199 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional
+
+from task.utils import serialization
+from task.utils.constants import TOOL_CALL_HISTORY_KEY, TOOL_CALL_HISTORY_COMPRESSED_KEY, TOOL_CALL_HISTORY_REF_KEY
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - depends on environment
+    redis = None
+
+
+class StateStore(ABC):
+    """Server-side storage for serialized agent state."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, data: bytes) -> None:
+        pass
+
+
+class FileStateStore(StateStore):
+    """
+    Stores state as files in local directory.
+    Files not written for `ttl_seconds` are expired by modification time, writes sweep the directory
+    at most once per `cleanup_interval` seconds.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: int = 7 * 24 * 3600, cleanup_interval: float = 3600.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(data)
+        except FileNotFoundError:
+            # Directory was removed as empty by concurrent cleanup
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        if time.monotonic() - self._last_cleanup >= self.cleanup_interval:
+            self._last_cleanup = time.monotonic()
+            self.cleanup()
+
+    def cleanup(self) -> int:
+        """Removes expired state files, returns number of removed files."""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for path in self.directory.rglob("*.json.z"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        # Drop conversation directories left empty
+        for directory in self.directory.iterdir():
+            if directory.is_dir():
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass
+        if removed:
+            print(f"[FileStateStore] Removed {removed} expired state files")
+        return removed
+
+    def _path(self, key: str) -> Path:
+        # Keys are generated by StateCodec, but state comes back from client so don't trust it
+        safe_key = "".join(c for c in key if c.isalnum() or c in "-_/").strip("/")
+        return self.directory / f"{safe_key}.json.z"
+
+
+class RedisStateStore(StateStore):
+    """Stores state in Redis with expiration."""
+
+    def __init__(self, url: str, ttl_seconds: int = 7 * 24 * 3600, prefix: str = "gpa:state:"):
+        if redis is None:
+            raise RuntimeError("Redis state store requires `redis` package, install it with `pip install redis`")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, data: bytes) -> None:
+        self.client.set(self.prefix + key, data, ex=self.ttl_seconds)
+
+
+class StateCodec:
+    """
+    Packs tool call history into assistant message state and unpacks it back.
+
+    Modes:
+        inline: history is embedded as is (default)
+        compressed: history is serialized, zlib-compressed and base64-encoded
+        server: history is stored in StateStore, only a reference is left in the message
+    Unpacking understands all representations regardless of mode, so the mode can be changed for live conversations.
+    State comes back from the client: corrupt data or history decompressing to more than `max_history_bytes`
+    is logged and left packed instead of failing the request.
+    Use `pack_async` / `unpack_async` on the event loop, they do store I/O in a thread.
+    """
+
+    MODES = ("inline", "compressed", "server")
+
+    def __init__(self, mode: str = "inline", store: Optional[StateStore] = None, max_history_bytes: int = 32 * 1024 * 1024):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown state mode '{mode}', expected one of {self.MODES}")
+        if mode == "server" and store is None:
+            raise ValueError("State store is required for 'server' state mode")
+        self.mode = mode
+        self.store = store
+        self.max_history_bytes = max_history_bytes
+
+    async def pack_async(self, state: dict[str, Any], conversation_id: str) -> dict[str, Any]:
+        if self.mode == "server":
+            return await asyncio.to_thread(self.pack, state, conversation_id)
+        return self.pack(state, conversation_id)
+
+    async def unpack_async(self, state: dict[str, Any]) -> dict[str, Any]:
+        if TOOL_CALL_HISTORY_REF_KEY in state:
+            return await asyncio.to_thread(self.unpack, state)
+        return self.unpack(state)
+
+    def pack(self, state: dict[str, Any], conversation_id: str) -> dict[str, Any]:
+        history = state.get(TOOL_CALL_HISTORY_KEY)
+        if self.mode == "inline" or not history:
+            return state
+
+        packed = {k: v for k, v in state.items() if k != TOOL_CALL_HISTORY_KEY}
+        compressed = zlib.compress(serialization.dumps(history).encode('utf-8'))
+        if self.mode == "compressed":
+            packed[TOOL_CALL_HISTORY_COMPRESSED_KEY] = base64.b64encode(compressed).decode('ascii')
+        else:
+            conversation_key = hashlib.sha256(conversation_id.encode('utf-8')).hexdigest()[:16]
+            ref = f"{conversation_key}/{uuid.uuid4().hex}"
+            self.store.set(ref, compressed)
+            packed[TOOL_CALL_HISTORY_REF_KEY] = ref
+        return packed
+
+    def unpack(self, state: dict[str, Any]) -> dict[str, Any]:
+        try:
+            if TOOL_CALL_HISTORY_COMPRESSED_KEY in state:
+                compressed = base64.b64decode(state[TOOL_CALL_HISTORY_COMPRESSED_KEY])
+            elif TOOL_CALL_HISTORY_REF_KEY in state:
+                compressed = self.store.get(str(state[TOOL_CALL_HISTORY_REF_KEY])) if self.store else None
+                if compressed is None:
+                    print(f"⚠️ Tool call history '{state[TOOL_CALL_HISTORY_REF_KEY]}' not found in state store")
+                    return state
+            else:
+                return state
+
+            history = serialization.loads(self._decompress(compressed))
+        except (binascii.Error, zlib.error, TypeError, ValueError) as e:
+            print(f"⚠️ Unable to unpack tool call history from state: {e}")
+            return state
+
+        unpacked = {
+            k: v for k, v in state.items()
+            if k not in (TOOL_CALL_HISTORY_COMPRESSED_KEY, TOOL_CALL_HISTORY_REF_KEY)
+        }
+        unpacked[TOOL_CALL_HISTORY_KEY] = history
+        return unpacked
+
+    def _decompress(self, compressed: bytes) -> bytes:
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(compressed, self.max_history_bytes)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"decompressed history exceeds {self.max_history_bytes} bytes")
+        if not decompressor.eof:
+            raise ValueError("compressed history is truncated")
+        return data
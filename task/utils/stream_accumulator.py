@@ -0,0 +1,67 @@
+import time
+from typing import Callable, Optional
+
+
+class StreamAccumulator:
+    """
+    Collects streamed text deltas and emits them in batches.
+    Pending text is emitted once it reaches `max_chars` or `max_interval` seconds passed since the last emit,
+    so one frame carries many tokens instead of one. Full text is kept in a list buffer and joined once.
+    Call `tick` on every received chunk so text isn't held back while the stream carries no text (e.g. tool calls).
+    """
+
+    def __init__(
+            self,
+            emit: Optional[Callable[[str], None]] = None,
+            max_chars: int = 256,
+            max_interval: float = 0.05,
+    ):
+        self._emit = emit
+        self.max_chars = max_chars
+        self.max_interval = max_interval
+        self._parts: list[str] = []
+        self._pending: list[str] = []
+        self._pending_size = 0
+        self._last_emit = time.monotonic()
+        # Stats to compare with per-delta emitting
+        self.deltas = 0
+        self.frames = 0
+
+    def append(self, text: str) -> None:
+        if not text:
+            return
+        self.deltas += 1
+        self._parts.append(text)
+        if self._emit is None:
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= self.max_chars:
+            self.flush()
+        else:
+            self.tick()
+
+    def tick(self) -> None:
+        """Emit pending text if `max_interval` passed since the last emit."""
+        if self._pending and time.monotonic() - self._last_emit >= self.max_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Emit all pending text as a single frame."""
+        if self._pending:
+            self._emit("".join(self._pending))
+            self.frames += 1
+            self._pending.clear()
+            self._pending_size = 0
+        self._last_emit = time.monotonic()
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    def __enter__(self) -> 'StreamAccumulator':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+        return False